@@ -1,43 +1,45 @@
-from datetime import datetime
+from urllib.parse import quote
 
 import reflex as rx
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
+from CrowdBid import db, metrics
 from CrowdBid.auction_create import create_auction_ui
 from CrowdBid.auction_edit import edit_page_ui
 from CrowdBid.auction_list import list_auction_ui
 from CrowdBid.bid import bid_ui
+from CrowdBid.broker import invalidation_task
 from CrowdBid.bid_data import data_bid_ui
-from sqlmodel import select
+from CrowdBid.cache import auction_cache
+from CrowdBid.csv_export import bid_lines, export_filename, result_lines
 import websockets
-from CrowdBid.models import Auction, Bid
-
-clients = set()
+from CrowdBid.hub import CLOSE_TIMEOUT, PING_INTERVAL, PING_TIMEOUT, RELAY_HOST, RELAY_PORT, hub
+from CrowdBid.listeners import registry
+from CrowdBid.maintenance import compact_events, maintenance_task, purge_expired
+from CrowdBid.summary import backfill_task
+from CrowdBid.models import Auction
 
 
 async def ws_handler(websocket):
-    clients.add(websocket)
-    try:
-        async for message in websocket:
-            # Broadcast an alle Clients (außer dem Sender)
-            for client in clients.copy():
-                if client != websocket:
-                    try:
-                        await client.send(message)
-                    except websockets.exceptions.ConnectionClosed:
-                        clients.remove(client)
-    finally:
-        clients.remove(websocket)
+    # Nachrichten nur an die Abonnenten der jeweiligen Auktion weiterleiten
+    await hub.handle(websocket)
 
 
 async def deploy_ws():
-    server = await websockets.serve(
-        ws_handler,
-        "127.0.0.1",  # Nur lokale Verbindungen
-        28765,  # Port für WebSocket
-        ping_interval=None,  # Deaktiviert automatische Pings
-        ping_timeout=None  # Deaktiviert Ping-Timeouts
-    )
+    try:
+        server = await websockets.serve(
+            ws_handler,
+            RELAY_HOST,  # Nur lokale Verbindungen
+            RELAY_PORT,  # Port für WebSocket
+            ping_interval=PING_INTERVAL,  # Heartbeat, tote Verbindungen werden getrennt
+            ping_timeout=PING_TIMEOUT,
+            close_timeout=CLOSE_TIMEOUT,  # Schließen ohne Antwort des Clients
+        )
+    except OSError as e:
+        # Bei mehreren Workern betreibt nur der erste das Relay
+        print(f"Relay nicht gestartet: {str(e)}")
+        return
     await server.wait_closed()
 
 
@@ -55,23 +57,70 @@ def not_found():
 api = FastAPI()
 @api.get("/maintenance")
 def maintenance():
-    """Entfernt abgelaufene Auktionen und deren Gebote."""
-    current_time = datetime.now()
-    with rx.session() as session:  # Synchrone Session
-        expired_auctions = session.exec(
-            select(Auction).where(Auction.expiration < current_time)
-        ).all()
-        for auction in expired_auctions:
-            bids = session.exec(select(Bid).where(Bid.ida == auction.id)).all()
-            for bid in bids:
-                session.delete(bid)
-            session.delete(auction)
-        session.commit()
-    return {"status": "OK", "cleaned_auctions": len(expired_auctions)}
+    """Entfernt abgelaufene Auktionen und deren Gebote, kompaktiert das Ereignisprotokoll."""
+    batches = purge_expired()
+    compacted = compact_events()
+    return {
+        "status": "OK",
+        "cleaned_auctions": sum(b["auctions"] for b in batches),
+        "cleaned_bids": sum(b["bids"] for b in batches),
+        "compacted_events": sum(b["events"] for b in compacted),
+        "batches": batches,
+    }
+
+
+@api.get("/metrics")
+def metrics_endpoint():
+    """Zähler und Zeiten im Textformat von Prometheus (nur mit CROWDBID_METRICS=1)."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metriken sind abgeschaltet")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def csv_response(lines, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        lines,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
+def auction_by_config_token(config_token: str) -> Auction:
+    with db.session() as session:
+        auction = auction_cache.by_config_token(session, config_token)
+    if auction is None:
+        raise HTTPException(status_code=404, detail="Auktion nicht gefunden")
+    return auction
+
+
+@api.get("/export/{config_token}/auktion.csv")
+def export_csv(config_token: str):
+    """Streamt die Gebotstabelle einer Auktion als CSV."""
+    auction = auction_by_config_token(config_token)
+    return csv_response(bid_lines(auction.id), export_filename("auktion", auction.topic))
+
+
+@api.get("/export/{config_token}/ergebnis.csv")
+def export_result_csv(config_token: str):
+    """Streamt das Ergebnis einer Auktion (letztes Gebot je Bietendem) als CSV."""
+    auction = auction_by_config_token(config_token)
+    return csv_response(result_lines(auction.id), export_filename("auktionsergebnis", auction.topic))
 
 
 app = rx.App(api_transformer=api)
+
+
+def session_alive(client_token: str) -> bool:
+    """Ist der Tab mit diesem Client-Token noch per WebSocket verbunden?"""
+    namespace = app.event_namespace
+    return namespace is None or client_token in namespace.token_to_sid
+
+
+registry.is_alive = session_alive
 app.register_lifespan_task(deploy_ws)
+app.register_lifespan_task(maintenance_task)
+app.register_lifespan_task(invalidation_task)
+app.register_lifespan_task(backfill_task)
 app.add_page(create_auction_ui, route="/")
 app.add_page(list_auction_ui, route="/list")
 app.add_page(edit_page_ui)
@@ -4,6 +4,7 @@ import sqlmodel
 import secrets
 from sqlmodel import select
 
+from CrowdBid import db
 from CrowdBid.components import header
 from CrowdBid.models import Auction
 
@@ -53,7 +54,7 @@ class CreateAuctionState(rx.State):
             "target_bid": float(form_data.get("target_bid", 0))
         }
 
-        with rx.session() as session:
+        with db.session() as session:
 
             new_auction = Auction(**auction_data)
             session.add(new_auction)
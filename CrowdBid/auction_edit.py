@@ -3,16 +3,52 @@ import reflex as rx
 import sqlmodel
 import secrets
 import io
-import csv
+from typing import Optional
 
 from jeepney.low_level import padding
-from sqlmodel import select, func
+from reflex.config import get_config
+from sqlmodel import select
 
+from CrowdBid import db, event_log, events, metrics
+from CrowdBid.broker import notify
+from CrowdBid.cache import auction_cache, pivot_cache
 from CrowdBid.components import header
-from CrowdBid.models import Auction, Bid
+from CrowdBid.csv_import import StagedImport, import_bids, parse_lines, parse_upload
+from CrowdBid.maintenance import delete_auctions
+from CrowdBid.models import Auction
+from CrowdBid.writes import bump_version
 
 
 ### BACKEND ###
+
+# Synchrone Datenbankzugriffe der Handler, ausgeführt per ``db.run``
+
+def _get_auction(config_token: str) -> Optional[Auction]:
+    with db.session() as session:
+        return auction_cache.by_config_token(session, config_token)
+
+
+def _update_auction(ida: int, form_data: dict, round_end_mode: str, peek: bool) -> str:
+    """Speichert die Einstellungen; liefert das protokollierte Ereignis, offene Bietseiten laden damit neu."""
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        auction = session.exec(select(Auction).where(Auction.id == ida)).first()
+
+        auction.topic = form_data.get("topic", auction.topic)
+        auction.description = form_data.get("description", auction.description)
+        auction.target_bid = float(form_data.get("target_bid", auction.target_bid))
+        auction.expiration = datetime.strptime(form_data.get("expiration", auction.expiration.strftime("%Y-%m-%d")), "%Y-%m-%d")
+        auction.update_at = datetime.now()
+        auction.round_end_mode = round_end_mode
+        auction.peek = peek  # Speichere peek-Wert
+        session.add(auction)
+        payload = event_log.record(session, ida, seq, events.RELOAD, "Die Einstellungen der Auktion wurden geändert.")
+        session.commit()
+    pivot_cache.invalidate(ida)
+    auction_cache.invalidate(ida)
+    return payload
+
+
 # Im State fügen wir zwei neue Methoden hinzu:
 class EditAuctionState(rx.State):
     """Status für die Bearbeitungsseite."""
@@ -25,6 +61,7 @@ class EditAuctionState(rx.State):
     round_end_mode: str = "auto"
     peek: bool = True  # Neue State-Variable
     import_error: str = ""  # Für Fehlermeldungen beim Import
+    import_progress: str = ""  # Fortschritt beim Import
 
     @rx.event
     def validate_form(self):
@@ -60,167 +97,84 @@ class EditAuctionState(rx.State):
     def current_auction_token(self) -> str:
         return self.router.page.params.get("token", "")
 
-    def get_auction(self):
-        with rx.session() as session:
-            self.auction = session.exec(
-                select(Auction).where(Auction.config_token == self.current_auction_token)
-            ).first()
-            if self.auction is not None:
-                self.edit_url = f"{self.router.page.host}/{self.auction.config_token}/edit"
-                self.bid_url = f"{self.router.page.host}/{self.auction.token}/bid"
-                # Initialisiere die Formularfelder mit den aktuellen Werten
-                self.topic = self.auction.topic
-                self.target_bid = str(self.auction.target_bid)
-                self.round_end_mode = self.auction.round_end_mode
-                self.peek = self.auction.peek # Lade peek-Wert
-                # self.validate_form()
-            else:
-                return rx.redirect("/")
-
-    def update_auction(self, form_data: dict):
-        with rx.session() as session:
-            auction = session.exec(select(Auction).where(Auction.id == self.auction.id)).first()
-
-            auction.topic = form_data.get("topic", auction.topic)
-            auction.description = form_data.get("description", auction.description)
-            auction.target_bid = float(form_data.get("target_bid", auction.target_bid))
-            auction.expiration = datetime.strptime(form_data.get("expiration", auction.expiration.strftime("%Y-%m-%d")), "%Y-%m-%d")
-            auction.update_at = datetime.now()
-            auction.round_end_mode = self.round_end_mode
-            auction.peek = self.peek  # Speichere peek-Wert
-            session.add(auction)
-            session.commit()
-            self.is_form_valid = False
-
-    def delete_auction(self):
-        with rx.session() as session:
-            for bid in session.exec(select(Bid).where(Bid.ida == self.auction.id)).all():
-                session.delete(bid)
-            auction = session.exec(select(Auction).where(Auction.id == self.auction.id)).first()
-            session.delete(auction)
-            session.commit()
+    async def get_auction(self):
+        self.auction = await db.run(_get_auction, self.current_auction_token)
+        if self.auction is not None:
+            self.edit_url = f"{self.router.page.host}/{self.auction.config_token}/edit"
+            self.bid_url = f"{self.router.page.host}/{self.auction.token}/bid"
+            # Initialisiere die Formularfelder mit den aktuellen Werten
+            self.topic = self.auction.topic
+            self.target_bid = str(self.auction.target_bid)
+            self.round_end_mode = self.auction.round_end_mode
+            self.peek = self.auction.peek # Lade peek-Wert
+            # self.validate_form()
+        else:
+            return rx.redirect("/")
+
+    async def update_auction(self, form_data: dict):
+        await notify(self.auction.id, await db.run(_update_auction, self.auction.id, form_data, self.round_end_mode,
+                                                   self.peek))
+        self.is_form_valid = False
+
+    async def delete_auction(self):
+        await db.run(delete_auctions, [self.auction.id])
         return rx.redirect("/")
 
     def export_result_csv(self):
         """Exportiert das Ergemiss der Auktion als CSV-Datei."""
-        with rx.session() as session:
-            subq = select(Bid.name, func.max(Bid.round).label("max_round")).where(Bid.ida == self.auction.id).group_by(Bid.name).subquery()
-            bids = session.exec(select(Bid).join(subq, (Bid.name == subq.c.name) & (Bid.round == subq.c.max_round)).where(Bid.ida == self.auction.id)).all()
-            csv_content = ""
-            for bid in bids:
-                csv_content += f"{bid.name};{bid.bid}\n"
-
-            return rx.download(
-                data=csv_content,
-                filename=f"auktionsergebnis_{self.auction.topic.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            )
+        # Die Datei wird vom Backend gestreamt (siehe export_result_csv in CrowdBid.py)
+        return rx.redirect(f"{get_config().api_url}/export/{self.auction.config_token}/ergebnis.csv")
 
     def export_csv(self):
         """Exportiert die Auktionsdaten als CSV-Datei."""
-        with rx.session() as session:
-            # Alle Gebote für diese Auktion holen
-            bids = session.exec(
-                select(Bid).where(Bid.ida == self.auction.id).order_by(Bid.name, Bid.round)
-            ).all()
-
-            # Daten nach Namen gruppieren
-            bid_data = {}
-            for bid in bids:
-                if bid.name not in bid_data:
-                    bid_data[bid.name] = []
-                if bid.round > 0:
-                    while len(bid_data[bid.name]) < bid.round - 1:
-                        bid_data[bid.name].append("")
-                    bid_data[bid.name].append(f"{bid.bid}")
-
-            # CSV-Daten erstellen
-            csv_content = ""
-            for name, bids_list in bid_data.items():
-                csv_content += f"{name};{';'.join(bids_list)}\n"
-
-            # CSV-Datei zum Download anbieten
-            filename = f"auktion_{self.auction.topic.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-
-            return rx.download(
-                data=csv_content,
-                filename=filename
-            )
+        # Die Datei wird vom Backend gestreamt (siehe export_csv in CrowdBid.py)
+        return rx.redirect(f"{get_config().api_url}/export/{self.auction.config_token}/auktion.csv")
+
+    async def _notify_import(self, payload: str):
+        """Verwirft den Cache und lässt offene Bietseiten neu laden (``payload`` siehe ``BulkWriter``)."""
+        pivot_cache.invalidate(self.auction.id)
+        await notify(self.auction.id, payload)
 
+    @metrics.timed("handle_file_upload")
     async def handle_file_upload(self, files: list[rx.UploadFile]):
+        self.import_progress = ""
         for file in files:
-            print(file.name)
             try:
-                # Datei lesen
-                content = await file.read()
-                csv_text = content.decode('utf-8')
-
-                # CSV parsen
-                imported_data = []
-                for line in csv_text.strip().split('\n'):
-                    if line.strip():
-                        parts = line.split(';')
-                        if len(parts) >= 2:  # Mindestens Name und ein Gebot
-                            name = parts[0].strip()
-                            bids = []
-                            for i, bid_str in enumerate(parts[1:], 1):
-                                if bid_str.strip():  # Nur nicht-leere Gebote
-                                    try:
-                                        bid_value = float(bid_str.strip())
-                                        bids.append((i, bid_value))
-                                    except ValueError:
-                                        continue
-                            if bids:  # Nur wenn mindestens ein Gebot vorhanden ist
-                                imported_data.append((name, bids))
-
-                if not imported_data:
-                    self.import_error = "Keine gültigen Daten in der CSV-Datei gefunden"
-                    return
-
-                # Alle vorhandenen Gebote löschen und neue erstellen
-                with rx.session() as session:
-                    # Alle Gebote für diese Auktion löschen
-                    existing_bids = session.exec(select(Bid).where(Bid.ida == self.auction.id)).all()
-                    for bid in existing_bids:
-                        session.delete(bid)
-
-                    # Neue Gebote erstellen
-                    current_time = datetime.now()
-                    for name, bids in imported_data:
-                        # Dummy-Eintrag für Runde 0 (zum Hinzufügen des Bieters)
-                        session.add(Bid(
-                            name=name,
-                            round=0,
-                            bid=0,
-                            ida=self.auction.id,
-                            time=current_time
-                        ))
-
-                        # Echte Gebote
-                        for round_num, bid_value in bids:
-                            session.add(Bid(
-                                name=name,
-                                round=round_num,
-                                bid=bid_value,
-                                ida=self.auction.id,
-                                time=current_time
-                            ))
-
-                    session.commit()
-
-                return rx.toast.success(
-                    f"CSV-Datei erfolgreich importiert! {len(imported_data)} Bieter wurden importiert.",
+                # Datei blockweise lesen und parsen; jeder Block wird in einer eigenen
+                # kurzen Transaktion zwischengespeichert (siehe StagedImport)
+                staged = StagedImport(self.auction.id)
+                try:
+                    async for name, bids in parse_upload(file):
+                        if staged.add(name, bids):
+                            await db.run(staged.flush)
+                            self.import_progress = f"{staged.bidders} Bieter, {staged.written} Gebote eingelesen"
+                            yield
+                    if not staged.bidders:
+                        self.import_error = "Keine gültigen Daten in der CSV-Datei gefunden"
+                        return
+                    await db.run(staged.finish)
+                finally:
+                    await db.run(staged.discard)
+                await self._notify_import(staged.payload)
+
+                yield rx.toast.success(
+                    f"CSV-Datei erfolgreich importiert! {staged.bidders} Bieter wurden importiert.",
                     title="Import erfolgreich",
                 )
+                return
             except Exception as e:
                 self.import_error = f"Fehler beim Importieren: {str(e)}"
-                return rx.toast.error(
+                yield rx.toast.error(
                     "Fehler beim Importieren der CSV-Datei",
                     title="Import fehlgeschlagen",
                 )
+                return
 
+    @metrics.timed("import_csv")
     async def import_csv(self, form_data: dict):
         """Importiert Auktionsdaten aus einer CSV-Datei."""
         self.import_error = ""
+        self.import_progress = ""
 
         csv_file = form_data.get("csv_file", None)
         if not csv_file:
@@ -228,61 +182,26 @@ class EditAuctionState(rx.State):
             return
 
         try:
-            # CSV-Datei lesen und verarbeiten
-            csv_text = csv_file.decode("utf-8")
-            csv_data = csv.reader(io.StringIO(csv_text), delimiter=";")
-
-            imported_data = []
-            for row in csv_data:
-                if row:
-                    name = row[0].strip()
-                    bids = []
-                    for i, bid_str in enumerate(row[1:], 1):
-                        try:
-                            bid_value = float(bid_str.strip())
-                            bids.append((i, bid_value))
-                        except ValueError:
-                            pass
-                    imported_data.append((name, bids))
-
-            with rx.session() as session:
-                # Alle Gebote für diese Auktion löschen
-                existing_bids = session.exec(select(Bid).where(Bid.ida == self.auction.id)).all()
-                for bid in existing_bids:
-                    session.delete(bid)
-
-                # Neue Gebote erstellen
-                current_time = datetime.now()
-                for name, bids in imported_data:
-                    # Dummy-Eintrag für Runde 0 (zum Hinzufügen des Bieters)
-                    session.add(Bid(
-                        name=name,
-                        round=0,
-                        bid=0,
-                        ida=self.auction.id,
-                        time=current_time
-                    ))
-
-                    # Echte Gebote
-                    for round_num, bid_value in bids:
-                        session.add(Bid(
-                            name=name,
-                            round=round_num,
-                            bid=bid_value,
-                            ida=self.auction.id,
-                            time=current_time
-                        ))
-
-                session.commit()
-
-            return rx.toast.success(
-                f"CSV-Datei erfolgreich importiert! {len(imported_data)} Bieter wurden importiert.",
+            # CSV-Datei zeilenweise dekodieren und verarbeiten
+            lines = io.TextIOWrapper(io.BytesIO(csv_file), encoding="utf-8")
+            with db.session() as session:
+                # Jeder Block wird per db.run geparst und geschrieben
+                progress = import_bids(session, self.auction.id, parse_lines(lines, require_bids=False))
+                while (step := await db.run(next, progress, None)) is not None:
+                    writer = step
+                    self.import_progress = f"{writer.bidders} Bieter, {writer.written} Gebote geschrieben"
+                    yield
+                await db.run(session.commit)
+            await self._notify_import(writer.payload)
+
+            yield rx.toast.success(
+                f"CSV-Datei erfolgreich importiert! {writer.bidders} Bieter wurden importiert.",
                 title="Import erfolgreich",
             )
 
         except Exception as e:
             self.import_error = f"Fehler beim Importieren: {str(e)}"
-            return rx.toast.error(
+            yield rx.toast.error(
                 "Fehler beim Importieren der CSV-Datei",
                 title="Import fehlgeschlagen",
             )
@@ -652,6 +571,10 @@ def edit_page_ui():
                     ),
 
                 ),
+                rx.cond(
+                    EditAuctionState.import_progress != "",
+                    rx.text(EditAuctionState.import_progress, size="2", color="gray"),
+                ),
                 rx.divider(),
                 rx.divider(),
                 # Delete Button
@@ -1,28 +1,124 @@
+from typing import Optional
+
 import reflex as rx
 
+from CrowdBid import db
+from CrowdBid.cache import count_cache
+from CrowdBid.maintenance import delete_auctions
 from CrowdBid.components import header
 from CrowdBid.models import Auction
-from sqlmodel import select
+from sqlalchemy import tuple_
+from sqlmodel import func, select
 from datetime import datetime
 
 ### BACKEND ###
 
+PAGE_SIZE = 50
+
+LIST_COLUMNS = (Auction.id, Auction.token, Auction.config_token, Auction.topic, Auction.target_bid,
+                Auction.create_at, Auction.update_at, Auction.expiration)
+
+
+class AuctionRow(rx.Base):
+    """Eine Zeile der Liste, ohne die (lange) Beschreibung."""
+    id: int
+    token: str
+    config_token: str
+    topic: Optional[str]
+    target_bid: Optional[float]
+    create_at: datetime
+    update_at: datetime
+    expiration: Optional[datetime]
+
+
+def list_filters(topic_filter: str, expiry_filter: str) -> list:
+    filters = []
+    if topic_filter.strip():
+        filters.append(Auction.topic.contains(topic_filter.strip(), autoescape=True))
+    if expiry_filter == "active":
+        filters.append(Auction.expiration >= datetime.now())
+    elif expiry_filter == "expired":
+        filters.append(Auction.expiration < datetime.now())
+    return filters
+
+
+def count_auctions(session, topic_filter: str, expiry_filter: str) -> int:
+    key = (topic_filter.strip(), expiry_filter)
+    count = count_cache.get(key)
+    if count is not None:
+        return count
+    count = session.exec(select(func.count()).select_from(Auction).where(*list_filters(topic_filter, expiry_filter))).one()
+    count_cache.put(key, count)
+    return count
+
+
+def fetch_page(topic_filter: str, expiry_filter: str, sort_desc: bool,
+               cursor: Optional[tuple[datetime, int]]) -> tuple[list, int]:
+    """Eine Seite (plus eine Zeile zum Erkennen der nächsten) und die Gesamtzahl; per ``db.run``."""
+    order = (Auction.update_at.desc(), Auction.id.desc()) if sort_desc else (Auction.update_at, Auction.id)
+    query = select(*LIST_COLUMNS).where(*list_filters(topic_filter, expiry_filter))
+    if cursor is not None:
+        key = tuple_(Auction.update_at, Auction.id)
+        query = query.where(key < tuple_(*cursor) if sort_desc else key > tuple_(*cursor))
+    with db.session() as session:
+        rows = session.exec(query.order_by(*order).limit(PAGE_SIZE + 1)).all()
+        return rows, count_auctions(session, topic_filter, expiry_filter)
+
+
 class ListAuctionState(rx.State):
-    auctions: list[Auction] = []
+    auctions: list[AuctionRow] = []
     current_auction: Auction = Auction()
+    topic_filter: str = ""
+    expiry_filter: str = "all"  # all, active, expired
+    sort_desc: bool = True
+    total: int = 0
+    page: int = 1
+    has_next: bool = False
+    # Keyset (update_at, id) der letzten Zeile jeder vorherigen Seite
+    _cursors: list[tuple[datetime, int]] = []
+
+    async def load_entries(self):
+        rows, self.total = await db.run(fetch_page, self.topic_filter, self.expiry_filter, self.sort_desc,
+                                        self._cursors[-1] if self._cursors else None)
+        self.has_next = len(rows) > PAGE_SIZE
+        self.auctions = [AuctionRow(**row._asdict()) for row in rows[:PAGE_SIZE]]
+        self.page = len(self._cursors) + 1
+
+    async def _first_page(self):
+        self._cursors = []
+        await self.load_entries()
+
+    @rx.event
+    async def next_page(self):
+        if self.has_next and self.auctions:
+            self._cursors = self._cursors + [(self.auctions[-1].update_at, self.auctions[-1].id)]
+            await self.load_entries()
+
+    @rx.event
+    async def prev_page(self):
+        if self._cursors:
+            self._cursors = self._cursors[:-1]
+            await self.load_entries()
 
-    def load_entries(self) -> list[Auction]:
-        with rx.session() as session:
-            query = select(Auction)
-            self.auctions = session.exec(query).all()
+    @rx.event
+    async def filter_topic(self, value: str):
+        self.topic_filter = value
+        await self._first_page()
 
     @rx.event
-    def delete_auction(self, id: int):
-        with rx.session() as session:
-            auction = session.exec(select(Auction).where(Auction.id == id)).first()
-            session.delete(auction)
-            session.commit()
-        self.load_entries()
+    async def filter_expiry(self, value: str):
+        self.expiry_filter = value
+        await self._first_page()
+
+    @rx.event
+    async def toggle_sort(self):
+        self.sort_desc = not self.sort_desc
+        await self._first_page()
+
+    @rx.event
+    async def delete_auction(self, id: int):
+        await db.run(delete_auctions, [id])
+        await self.load_entries()
 
 
 
@@ -31,12 +127,49 @@ class ListAuctionState(rx.State):
 def list_auction_ui():
     return rx.vstack(
         header(),
+        list_controls(),
         auktion_table(),
+        list_pager(),
         on_mount=ListAuctionState.load_entries,
         width="100%",
         padding="0.7rem"
     )
 
+
+def list_controls():
+    return rx.hstack(
+        rx.input(
+            placeholder="Filter topic",
+            value=ListAuctionState.topic_filter,
+            on_change=ListAuctionState.filter_topic.debounce(300),
+        ),
+        rx.select(
+            ["all", "active", "expired"],
+            value=ListAuctionState.expiry_filter,
+            on_change=ListAuctionState.filter_expiry,
+        ),
+        rx.button(
+            rx.cond(ListAuctionState.sort_desc, rx.icon("arrow-down"), rx.icon("arrow-up")),
+            "Updated",
+            on_click=ListAuctionState.toggle_sort,
+            variant="outline",
+        ),
+        rx.spacer(),
+        rx.text(f"{ListAuctionState.total} auctions"),
+        width="100%",
+        align_items="center",
+    )
+
+
+def list_pager():
+    return rx.hstack(
+        rx.button("Prev", on_click=ListAuctionState.prev_page, disabled=ListAuctionState.page <= 1),
+        rx.text(f"Page {ListAuctionState.page}"),
+        rx.button("Next", on_click=ListAuctionState.next_page, disabled=~ListAuctionState.has_next),
+        align_items="center",
+    )
+
+
 def auktion_table():
     return rx.table.root(
         rx.table.header(
@@ -70,5 +203,4 @@ def auktion_table():
                 )
             )
         ),
-        on_mount=ListAuctionState.load_entries
     )
\ No newline at end of file
@@ -1,22 +1,100 @@
-import asyncio
-import math
+import os
 
 import reflex as rx
-import websockets
 from sqlmodel import select
+from CrowdBid import db, event_log, events, metrics, summary
+from CrowdBid.broker import notify
+from CrowdBid.cache import auction_cache, pivot_cache
 from CrowdBid.components import header
+from CrowdBid.listeners import registry
 from CrowdBid.models import Auction, Bid
+from CrowdBid.pivot import BidPivot
+from CrowdBid.writes import RoundClosed, bump_version, close_round, place_bid
 from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Tuple
 
 
 ### BACKEND ###
 
+# Größe des sichtbaren Ausschnitts der Gebotstabelle
+WINDOW_ROWS = int(os.environ.get("CROWDBID_WINDOW_ROWS", "50"))
+WINDOW_COLS = int(os.environ.get("CROWDBID_WINDOW_COLS", "12"))
+
+
+# Synchrone Datenbankzugriffe der Handler, ausgeführt per ``db.run``
+
+def _load_auction(token: str) -> Optional[Auction]:
+    with db.session() as session:
+        return auction_cache.by_token(session, token)
+
+
+def _load_pivot(token: str) -> Tuple[Optional[Auction], Optional[BidPivot]]:
+    with db.session() as session:
+        auction = auction_cache.by_token(session, token)
+        if auction is None:
+            return None, None
+        return auction, pivot_cache.get(session, auction)
+
+
+def _load_events(ida: int, seq: int) -> Optional[List[str]]:
+    with db.session() as session:
+        return event_log.since(session, ida, seq)
+
+
+# Die Schreibzugriffe liefern das protokollierte Ereignis zum Veröffentlichen
+
+def _write_bid(ida: int, name: str, bid: float, expected_round: int) -> str:
+    with db.session() as session:
+        payload = place_bid(session, ida, name, bid, expected_round)
+        session.commit()
+    pivot_cache.invalidate(ida)
+    return payload
+
+
+def _write_round_end(ida: int, expected_round: int) -> Optional[str]:
+    with db.session() as session:
+        payload = close_round(session, ida, expected_round)
+        if payload is not None:
+            session.commit()
+    pivot_cache.invalidate(ida)
+    auction_cache.invalidate(ida)
+    return payload
+
+
+def _write_rename(ida: int, name_alt: str, name_neu: str) -> Optional[str]:
+    payload = None
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        if not session.exec(select(Bid).where((Bid.ida == ida) & (Bid.name == name_neu))).first():
+            session.exec(update(Bid).where((Bid.ida == ida) & (Bid.name == name_alt)).values(name=name_neu))
+            summary.rename(session, ida, name_alt, name_neu)
+            payload = event_log.record(session, ida, seq, events.RENAME, f"{name_alt} hat sich in {name_neu} umbenannt.",
+                                       old=name_alt, new=name_neu)
+            session.commit()
+    pivot_cache.invalidate(ida)
+    return payload
+
+
+def _write_name(ida: int, name: str) -> str:
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        session.add(Bid(name=name, round=0, bid=0, ida=ida, time=datetime.now()))
+        summary.add_bidder(session, ida, name)
+        payload = event_log.record(session, ida, seq, events.ADD, f"Neuer Bietende: {name}", name=name)
+        session.commit()
+    pivot_cache.invalidate(ida)
+    return payload
+
+
 # Aktuell gemischt Deutsch/Englisch
 class BidState(rx.State):
     new_name: str = ""  # Deutsch
-    bids: List[Dict[str, Any]] = []
+    # Sichtbarer Ausschnitt in kompakter Form: eine Liste je Zeile statt eines Dicts
+    names: List[str] = []
+    cells: List[List[Optional[float]]] = []  # je Zeile die Werte zu ``rounds``
+    current: List[bool] = []  # Wert in der aktuellen Runde vorhanden
     actual_round: int = 1
     status: str = ""
     auction: Optional[Auction] = None
@@ -29,45 +107,82 @@ class BidState(rx.State):
     hovered_name: str = ""
     editing_value_name: str = ""
     is_valid_bid: bool = False
+    bidder_count: int = 0
+    round_count: int = 0
+    row_offset: int = 0  # erster sichtbarer Bietender
+    col_back: int = 0  # sichtbare Runden, vom Ende aus zurückgeblättert
+    _pivot: Optional[BidPivot] = None
 
     def reset_bid_validation(self):
         self.is_valid_bid = False
 
     @rx.event(background=True)
     async def ws_listener(self):
-        while True:
-            try:
-                async with websockets.connect("ws://localhost:28765") as ws:
-                    async for message in ws:
-                        async with self:
-                            msg = message.split("#")
-                            if msg[0] == f"A{self.auction.id}":
-                                self.load_bids()
-                                if msg[1]:
-                                    yield rx.toast.info(msg[1])
-            except Exception:
-                await asyncio.sleep(2)
-
-    @rx.event(background=True)
-    async def send_ws(self, msg: str = ""):
+        async with self:
+            token = self.auction_token
+            client_token = self.router.session.client_token
+        auction = await db.run(_load_auction, token)
+        if auction is None:
+            return
+        ida = auction.id
+        # Ein gemeinsames Abonnement je Auktion und Worker; lädt derselbe Tab neu,
+        # wird dieser Feed geschlossen und die Schleife endet
+        feed = registry.join(ida, client_token)
         try:
-            async with websockets.connect("ws://localhost:28765") as ws:
-                await ws.send(f"A{self.auction.id}#{msg}")
-        except Exception:
-            pass
+            while (batch := await feed.next_batch()) is not None:
+                try:
+                    # Ein Stapel kurz nacheinander eingetroffener Ereignisse: einmal anzeigen
+                    batch_events = [events.decode(message.partition("#")[2]) for message in batch]
+                    async with self:
+                        seq = self._pivot.seq if self._pivot is not None else None
+                        applied = self._apply_events(batch_events)
+                    if not applied and seq is not None:
+                        # Lücke oder Neuaufbau des Abonnements: Ereignisse seit ``seq`` nachholen
+                        missed = await db.run(_load_events, ida, seq)
+                        if missed is not None:
+                            async with self:
+                                applied = self._apply_events([events.decode(payload) for payload in missed])
+                    if not applied:
+                        # Neu laden ohne die Sperre des States zu halten
+                        auction, pivot = await db.run(_load_pivot, token)
+                        if auction is None:
+                            break  # Auktion gelöscht
+                        async with self:
+                            self.auction, self._pivot = auction, pivot
+                            self._show_pivot()
+                    texts = [event["text"] for event in batch_events if event["text"]]
+                    if texts:
+                        yield rx.toast.info(events.join_texts(texts), style={"whiteSpace": "pre-line"})
+                except Exception as e:
+                    print(f"Error: {str(e)}")
+        finally:
+            registry.leave(ida, client_token, feed)
+
+    def _apply_events(self, batch_events: List[dict]) -> bool:
+        """Arbeitet Ereignisse in die eigene Gebotstabelle ein; ``False`` heißt: nachholen oder neu laden."""
+        if self._pivot is None:
+            return False
+        if self._pivot.shared:
+            self._pivot = self._pivot.copy()
+        applied = all(self._pivot.apply(event) for event in batch_events)
+        if applied:
+            self._show_pivot()
+        return applied
 
     @rx.event
     def toggle_hidden(self):
         self.hidden = not self.hidden
         self.status += "."
-        return BidState.send_ws()
 
     @rx.event
-    def end_round(self):
-        with rx.session() as session:
-            session.exec(update(Auction).where(Auction.id == self.auction.id).values(last_round=self.actual_round + 1))
-            session.commit()
-        return BidState.send_ws(f"Die Runde {self.actual_round} wurde beendet.")
+    async def end_round(self):
+        try:
+            payload = await db.run(_write_round_end, self.auction.id, self.actual_round)
+        except RoundClosed as e:
+            await self.load_bids()
+            return rx.toast.info(str(e))
+        await notify(self.auction.id, payload)
+        return None
 
     @rx.var
     def auction_token(self) -> str:
@@ -78,90 +193,92 @@ class BidState(rx.State):
         return f"round{self.actual_round}" if self.actual_round > 0 else ""
 
     @rx.event
-    def handle_bid(self, form_data: dict):
+    @metrics.timed("handle_bid")
+    async def handle_bid(self, form_data: dict):
         self.is_valid_bid = False
         try:
-            with rx.session() as session:
-                session.merge(Bid(name=form_data["name"], round=self.actual_round, bid=float(form_data["bid"]), ida=self.auction.id, time=datetime.now()))
-                session.commit()
-            return BidState.send_ws(f"{form_data['name']} hat ein Gebot abgegeben.")
+            bid = float(form_data["bid"])
+            await notify(self.auction.id, await db.run(_write_bid, self.auction.id, form_data["name"], bid, self.actual_round))
+            return None
+        except RoundClosed as e:
+            await self.load_bids()
+            return rx.toast.warning(f"{str(e)} Bitte das Gebot erneut abgeben.")
+        except OperationalError as e:
+            # z.B. Schreibsperre auch nach WRITE_WAIT nicht frei: das Gebot ist nicht gespeichert
+            print(f"Error: {str(e)}")
+            await self.load_bids()
+            return rx.toast.error("Das Gebot konnte nicht gespeichert werden, die Datenbank ist ausgelastet. "
+                                  "Bitte das Gebot erneut abgeben.")
         except Exception as e:
             print(f"Error: {str(e)}")
-            self.load_bids()
-            return None
+            await self.load_bids()
+            return rx.toast.error("Das Gebot konnte nicht gespeichert werden. Bitte das Gebot erneut abgeben.")
 
     @rx.event
-    def load_bids(self):
-        with rx.session() as session:
-            # First, try to get the auction
-            self.auction = session.exec(select(Auction).where(Auction.token == self.auction_token)).first()
-
-            # If no auction is found, redirect to 404 and return early
-            if self.auction is None:
-                return rx.redirect("/404")
-
-            # Rest of the method remains the same
-            all_bids = session.exec(select(Bid).where(Bid.ida == self.auction.id)).all()
-
-            bid_dict = {}
-            ar = 0
-
-            for bid in all_bids:
-                if bid.name not in bid_dict:
-                    bid_dict[bid.name] = {}
-                bid_dict[bid.name][bid.round] = bid.bid
-                ar = max(ar, bid.round)
-
-            self.bids = []
-            bid_sum = {}
-            for name, values in bid_dict.items():
-                tb = {'name': name}
-                tv = float("nan")
-                for r in range(1, ar + 1):
-                    if r in values:
-                        tv = values.get(r)
-                        tb[r] = tv
-                    elif r < max(ar, self.auction.last_round) and not math.isnan(tv):
-                        tb[r] = - tv
-                    if not math.isnan(tv):
-                        bid_sum[r] = bid_sum.get(r, 0) + tv
-                self.bids.append(tb)
-
-            self.missing = sum([0 if ar in x else 1 for x in self.bids])
-            if ar == 0 or (self.missing == 0 and self.auction.round_end_mode == "auto") or self.auction.last_round > ar:
-                self.actual_round = ar + 1
-                self.missing = len(self.bids)
-            else:
-                self.actual_round = ar
+    @metrics.timed("load_bids")
+    async def load_bids(self):
+        self.auction, pivot = await db.run(_load_pivot, self.auction_token)
+
+        # If no auction is found, redirect to 404 and return early
+        if self.auction is None:
+            return rx.redirect("/404")
+
+        self._pivot = pivot
+        self._show_pivot()
+
+    def _show_pivot(self):
+        """Übernimmt den sichtbaren Ausschnitt der Gebotstabelle in die Anzeige.
+
+        An den Browser gehen nur WINDOW_ROWS Bietende und die WINDOW_COLS
+        jüngsten (bzw. per col_back gewählten) abgeschlossenen Runden.
+        """
+        pivot = self._pivot
+        self.actual_round = pivot.actual_round
+        self.missing = pivot.missing
+        self.status = pivot.status
+        self.bidder_count = len(pivot.names)
+        self.round_count = len(pivot.rounds)
+        self.row_offset = max(0, min(self.row_offset, self.bidder_count - WINDOW_ROWS))
+        self.col_back = max(0, min(self.col_back, self.round_count - WINDOW_COLS))
+        end = self.round_count - self.col_back
+        self.rounds = pivot.rounds[max(0, end - WINDOW_COLS):end]
+        self.sums = [pivot.sums[r - 1] for r in self.rounds]
+        self.names, self.cells, self.current = pivot.encode(
+            slice(self.row_offset, self.row_offset + WINDOW_ROWS), self.rounds)
 
-            if self.actual_round < 2:
-                self.status = f"Es sind {self.auction.target_bid} € aufzubringen. Durch Klicken auf das \uFF0B können neue Bietende hinzugefügt werden."
-            else:
-                s = bid_sum[self.actual_round - 1]
-                if self.auction.target_bid > s:
-                    self.status = f"Es sind {self.auction.target_bid} € aufzubringen. In der Letzten Runde wurden davon {s / self.auction.target_bid * 100:.1f} % erreicht. Es Fehlen noch {self.auction.target_bid - s} €"
-                else:
-                    self.status = f"Es waren {self.auction.target_bid} € aufzubringen. Es sind zusätzlich {s - self.auction.target_bid} € geboten worden"
-            self.rounds = list(range(1, self.actual_round))
-            self.sums = [float(bid_sum.get(i, 0)) if bid_sum.get(i, 0).is_integer() else bid_sum.get(i, 0) for i in range(1, self.actual_round)]
+    @rx.event
+    def scroll_rows(self, delta: int):
+        self.row_offset += delta
+        self._show_pivot()
 
     @rx.event
-    def rename_bidder(self, name_alt: str, name_neu: str):
-        with rx.session() as session:
-            if not session.exec(select(Bid).where((Bid.ida == self.auction.id) & (Bid.name == name_neu))).first():
-                session.exec(update(Bid).where((Bid.ida == self.auction.id) & (Bid.name == name_alt)).values(name=name_neu))
-                session.commit()
+    def scroll_cols(self, delta: int):
+        self.col_back += delta
+        self._show_pivot()
+
+    @rx.var
+    def is_windowed(self) -> bool:
+        return self.bidder_count > WINDOW_ROWS or self.round_count > WINDOW_COLS
+
+    @rx.var
+    def window_info(self) -> str:
+        first_round = self.rounds[0] if self.rounds else 0
+        last_round = self.rounds[-1] if self.rounds else 0
+        return (f"Bietende {min(self.row_offset + 1, self.bidder_count)}–{min(self.row_offset + WINDOW_ROWS, self.bidder_count)} von {self.bidder_count}, "
+                f"Runden {first_round}–{last_round} von {self.round_count}")
 
     @rx.event
-    def add_name(self):
+    async def rename_bidder(self, name_alt: str, name_neu: str):
+        await notify(self.auction.id, await db.run(_write_rename, self.auction.id, name_alt, name_neu))
+
+    @rx.event
+    async def add_name(self):
         if self.new_name.strip():
-            with rx.session() as session:
-                session.add(Bid(name=self.new_name.strip(), round=0, bid=0, ida=self.auction.id, time=datetime.now()))
-                session.commit()
+            name = self.new_name.strip()
+            payload = await db.run(_write_name, self.auction.id, name)
             self.new_name = ""
             self.show_add_input = False
-            return BidState.send_ws(f"Neuer Bietende: {self.new_name.strip()}")
-        return None
+            await notify(self.auction.id, payload)
 
     @rx.event
     def show_add(self):
@@ -187,15 +304,15 @@ class BidState(rx.State):
         self.hovered_name = ""
 
     @rx.event
-    def confirm_edit_name(self):
+    async def confirm_edit_name(self):
         if self.editing_value_name.strip():
             newn = self.editing_value_name
             oldn = self.editing_name
-            self.rename_bidder(oldn, newn)
+            notify = await self.rename_bidder(oldn, newn)
             self.editing_name = ""
             self.editing_value_name = ""
             self.hovered_name = ""
-            return BidState.send_ws(f"{oldn} hat sich in {newn} umbenannt.")
+            return notify
         return None
 
     @rx.event
@@ -358,8 +475,24 @@ def bidder(name):
     )
 
 
+def window_pager():
+    return rx.cond(
+        BidState.is_windowed,
+        rx.hstack(
+            rx.icon("chevrons-left", on_click=BidState.scroll_cols(WINDOW_COLS), style={"cursor": "pointer"}),
+            rx.icon("chevrons-right", on_click=BidState.scroll_cols(-WINDOW_COLS), style={"cursor": "pointer"}),
+            rx.icon("chevrons-up", on_click=BidState.scroll_rows(-WINDOW_ROWS), style={"cursor": "pointer"}),
+            rx.icon("chevrons-down", on_click=BidState.scroll_rows(WINDOW_ROWS), style={"cursor": "pointer"}),
+            rx.text(BidState.window_info, size="1", color="gray"),
+            spacing="3",
+            align="center",
+        ),
+    )
+
+
 def bid_table():
     return rx.box(
+        window_pager(),
         rx.table.root(
             rx.table.header(
                 rx.table.row(
@@ -378,7 +511,7 @@ def bid_table():
                         lambda r: rx.table.column_header_cell(f"R{r}", vertical_align="middle")
                     ),
                     rx.cond(
-                        BidState.bids.length() > 1,
+                        BidState.bidder_count > 1,
                         rx.table.column_header_cell(
                             f"R{BidState.actual_round}",
                         ),
@@ -387,10 +520,10 @@ def bid_table():
             ),
             rx.table.body(
                 rx.foreach(
-                    BidState.bids,
-                    lambda bid: rx.table.row(
+                    BidState.names,
+                    lambda name, i: rx.table.row(
                         rx.table.cell(
-                            bidder(bid["name"]),
+                            bidder(name),
                             vertical_align="middle",
                             style={
                                 "position": "sticky",
@@ -401,29 +534,33 @@ def bid_table():
                         ),
 
                         rx.foreach(
-                            BidState.rounds,
-                            lambda r: rx.table.cell(
+                            BidState.cells[i],
+                            lambda value: rx.table.cell(
                                 rx.cond(
                                     BidState.hidden,
                                     rx.icon("eye-off", color="gray", size=16),
                                     rx.cond(
-                                        rx.Var(f"{bid[r]} <= 0", _var_type=bool),
-                                        rx.text.em(rx.Var(f"-{bid[r]}", _var_type=float), color="grey"),
-                                        rx.text(bid.get(r, "-"))
+                                        value.is_none(),
+                                        rx.text("-"),
+                                        rx.cond(
+                                            rx.Var(f"{value} <= 0", _var_type=bool),
+                                            rx.text.em(rx.Var(f"-{value}", _var_type=float), color="grey"),
+                                            rx.text(value)
+                                        ),
                                     ),
                                 ),
                                 vertical_align="middle"
                             )
                         ),
                         rx.cond(
-                            BidState.bids.length() > 1,
+                            BidState.bidder_count > 1,
                             rx.table.cell(
                                 rx.cond(
-                                    bid.contains(BidState.actual_round),
+                                    BidState.current[i],
                                     rx.hstack(
                                         rx.dialog.root(
                                             rx.dialog.trigger(rx.button("Ändern", width="70px")),
-                                            bid_dialog(bid["name"], False),
+                                            bid_dialog(name, False),
                                             on_open_change=BidState.reset_bid_validation,
                                         ),
                                         rx.icon("circle-check-big", color="green", size=24),
@@ -431,7 +568,7 @@ def bid_table():
                                     rx.hstack(
                                         rx.dialog.root(
                                             rx.dialog.trigger(rx.button("Bieten", width="70px")),
-                                            bid_dialog(bid["name"], True),
+                                            bid_dialog(name, True),
                                             on_open_change=BidState.reset_bid_validation,
                                         ),
                                         rx.icon("circle", color="gray", size=24),
@@ -471,7 +608,7 @@ def bid_table():
                         lambda r: rx.table.column_header_cell("")
                     ),
                     rx.cond(
-                        BidState.bids.length() > 1,
+                        BidState.bidder_count > 1,
                         rx.table.column_header_cell("")
                     ),
                 ),
@@ -492,7 +629,7 @@ def bid_table():
                         lambda r: rx.table.column_header_cell(f"{r}", vertical_align="middle")
                     ),
                     rx.cond(
-                        BidState.bids.length() > 1,
+                        BidState.bidder_count > 1,
                         rx.table.column_header_cell(
                             # Bei "auto" - zeige die Info-Box
                             rx.cond(
@@ -545,7 +682,7 @@ def bid_table():
                                     ),
                                     # Bei "manual_first" - zeige immer Button
                                     rx.cond(
-                                        BidState.bids.length() - BidState.missing > 0,
+                                        BidState.bidder_count - BidState.missing > 0,
                                         rx.button(
                                             "Runde beenden",
                                             on_click=BidState.end_round,
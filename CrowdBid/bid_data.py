@@ -1,14 +1,86 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional, Tuple
 import reflex as rx
 import sqlmodel
 from sqlmodel import select
 
+from CrowdBid import db, event_log, events, summary
+from CrowdBid.broker import notify
+from CrowdBid.cache import auction_cache, pivot_cache
 from CrowdBid.components import header
 from CrowdBid.models import Auction, Bid
+from CrowdBid.writes import bump_version
 
 ### BACKEND ###
 
+# Synchrone Datenbankzugriffe der Handler, ausgeführt per ``db.run``; die
+# Schreibzugriffe liefern das protokollierte Ereignis zum Veröffentlichen
+
+def _load_entries(token: str) -> Tuple[Optional[Auction], List[Bid]]:
+    with db.session() as session:
+        auction = auction_cache.by_token(session, token)
+        if auction is None:
+            return None, []
+        return auction, session.exec(select(Bid).where(Bid.ida == auction.id)).all()
+
+
+def _add_bid(ida: int, form_data: dict) -> str:
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        new_bid = Bid(**form_data)
+        new_bid.ida = ida
+        session.add(new_bid)
+        summary.rebuild(session, ida)
+        payload = event_log.record(session, ida, seq, events.EDIT, op="add", name=new_bid.name, round=new_bid.round,
+                                   bid=new_bid.bid)
+        session.commit()
+    pivot_cache.invalidate(ida)
+    return payload
+
+
+def _update_bid(ida: int, name: str, round: int, form_data: dict) -> str:
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        bid = session.exec(
+            select(Bid).where(
+                (Bid.ida == ida) &
+                (Bid.name == name) &
+                (Bid.round == round)
+            )
+        ).first()
+        for field, value in form_data.items():
+            setattr(bid, field, value)
+        session.add(bid)
+        summary.rebuild(session, ida)
+        payload = event_log.record(session, ida, seq, events.EDIT, op="update", name=name, round=round,
+                                   changes={k: v for k, v in form_data.items() if k in ("name", "round", "bid")})
+        session.commit()
+    pivot_cache.invalidate(ida)
+    return payload
+
+
+def _delete_bid(ida: int, name: str, round: int) -> Optional[str]:
+    payload = None
+    with db.session() as session:
+        seq = bump_version(session, ida)
+        bid = session.exec(
+            select(Bid).where(
+                sqlmodel.and_(
+                    Bid.ida == ida,
+                    Bid.name == name,
+                    Bid.round == round
+                )
+            )
+        ).first()
+        if bid:
+            session.delete(bid)
+            summary.rebuild(session, ida)
+            payload = event_log.record(session, ida, seq, events.EDIT, op="delete", name=name, round=round, bid=bid.bid)
+            session.commit()
+            pivot_cache.invalidate(ida)
+    return payload
+
+
 class DataBidState(rx.State):
     """Der App State."""
     auction: Auction = None
@@ -21,64 +93,33 @@ class DataBidState(rx.State):
         """Get the token from the URL parameters."""
         return self.router.page.params.get("token", "")
 
-    def load_entries(self):
+    async def load_entries(self):
         """Lädt die Auktion anhand des Tokens."""
-        with rx.session() as session:
-            self.auction = session.exec(
-                select(Auction).where(Auction.token == self.auction_token)
-            ).first()
-            if self.auction:
-                self.bids = session.exec(
-                    select(Bid).where(Bid.ida== self.auction.id)
-                ).all()
+        auction, bids = await db.run(_load_entries, self.auction_token)
+        self.auction = auction
+        if auction:
+            self.bids = bids
 
     @rx.event
-    def add_bid(self, form_data: dict):
+    async def add_bid(self, form_data: dict):
         """Füge ein neues Bid hinzu."""
         form_data["time"] = datetime.now()
-        with rx.session() as session:
-            new_bid = Bid(**form_data)
-            new_bid.ida = self.auction.id
-            session.add(new_bid)
-            session.commit()
-            session.refresh(new_bid)
-        self.load_entries()
+        await notify(self.auction.id, await db.run(_add_bid, self.auction.id, form_data))
+        await self.load_entries()
 
     @rx.event
-    def update_bid(self, form_data: dict):
+    async def update_bid(self, form_data: dict):
         """Aktualisiere ein bestehendes Bid."""
         if not self.current_bid:
             return
-        with rx.session() as session:
-            bid = session.exec(
-                select(Bid).where(
-                    (Bid.ida == self.current_bid.ida) &
-                    (Bid.name == self.current_bid.name) &
-                    (Bid.round == self.current_bid.round)
-                )
-            ).first()
-            for field, value in form_data.items():
-                setattr(bid, field, value)
-            session.add(bid)
-            session.commit()
-        self.load_entries()
+        await notify(self.current_bid.ida, await db.run(_update_bid, self.current_bid.ida, self.current_bid.name,
+                                                         self.current_bid.round, form_data))
+        await self.load_entries()
 
     @rx.event
-    def delete_bid(self, ida: int, name: str, round: int):
-        with rx.session() as session:
-            bid = session.exec(
-                select(Bid).where(
-                    sqlmodel.and_(
-                        Bid.ida == ida,
-                        Bid.name == name,
-                        Bid.round == round
-                    )
-                )
-            ).first()
-            if bid:
-                session.delete(bid)
-                session.commit()
-        self.load_entries()
+    async def delete_bid(self, ida: int, name: str, round: int):
+        await notify(ida, await db.run(_delete_bid, ida, name, round))
+        await self.load_entries()
 
 
 ### FRONTEND ###
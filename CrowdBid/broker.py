@@ -0,0 +1,338 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import websockets
+from sqlalchemy import delete, func
+from sqlmodel import select
+
+from CrowdBid import db, events
+from CrowdBid.cache import auction_cache, pivot_cache
+from CrowdBid.hub import (ALL_TOPICS, RELAY_HOST, RELAY_PORT, SUBSCRIBE, Hub, Outbox, QueueSubscriber, auction_for, hub,
+                          topic_for)
+from CrowdBid.models import BrokerMessage
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional, nur für CROWDBID_BROKER=redis
+    aioredis = None
+
+# Mit mehreren Worker-Prozessen muss über ein gemeinsames Relay verteilt werden,
+# z.B. CROWDBID_RELAY_URL=ws://localhost:28765. Ohne Angabe bleibt alles im Prozess.
+RELAY_URL = os.environ.get("CROWDBID_RELAY_URL", "")
+
+# memory: nur im Prozess, relay: WebSocket-Relay (läuft in einem der Worker),
+# sqlite: gemeinsame Tabelle in der App-Datenbank, redis: Redis Pub/Sub
+BROKER = os.environ.get("CROWDBID_BROKER", "") or ("relay" if RELAY_URL else "memory")
+REDIS_URL = os.environ.get("CROWDBID_REDIS_URL", "redis://localhost:6379/0")
+# Abfrageintervall und Aufbewahrung der Tabelle beim Broker "sqlite"
+POLL_INTERVAL = float(os.environ.get("CROWDBID_BROKER_POLL_MS", "200")) / 1000
+RETENTION = float(os.environ.get("CROWDBID_BROKER_RETENTION", "60"))  # Sekunden
+
+# Nachrichten, die innerhalb dieses Fensters nach der ersten eintreffen, liefert
+# ``listen`` gemeinsam aus; der Empfänger aktualisiert dann nur einmal
+COALESCE_WINDOW = float(os.environ.get("CROWDBID_COALESCE_MS", "250")) / 1000
+
+
+class Subscription:
+    """Abonnement eines Themas; ``receive`` darf per Timeout abgebrochen werden."""
+
+    async def receive(self) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class QueueSubscription(Subscription):
+    """Abonnement bei einem Hub im eigenen Prozess."""
+
+    def __init__(self, hub: Hub, topic: str):
+        self.hub = hub
+        self.subscriber = QueueSubscriber()
+        hub.subscribe(self.subscriber, topic)
+
+    async def receive(self) -> str:
+        return await self.subscriber.outbox.get()
+
+    async def close(self):
+        self.hub.unsubscribe(self.subscriber)
+
+
+class Broker:
+    """Verteilt Nachrichten der Form "<topic>#<text>" an die Abonnenten des Themas.
+
+    ``remote`` ist gesetzt, wenn die Nachrichten auch andere Worker-Prozesse erreichen.
+    """
+
+    remote = True
+
+    async def publish(self, topic: str, message: str):
+        raise NotImplementedError
+
+    async def subscribe(self, topic: str) -> Subscription:
+        raise NotImplementedError
+
+
+class MemoryBroker(Broker):
+    """Nur ein Worker: verteilt über den Hub des Prozesses."""
+
+    remote = False
+
+    async def publish(self, topic: str, message: str):
+        await hub.publish(topic, message)
+
+    async def subscribe(self, topic: str) -> Subscription:
+        return QueueSubscription(hub, topic)
+
+
+class RelaySubscription(Subscription):
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def receive(self) -> str:
+        return await self.ws.recv()
+
+    async def close(self):
+        await self.ws.close()
+
+
+class RelayBroker(Broker):
+    """Verteilt über das WebSocket-Relay, das einer der Worker startet (siehe ``deploy_ws``)."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def publish(self, topic: str, message: str):
+        async with websockets.connect(self.url) as ws:
+            await ws.send(message)
+
+    async def subscribe(self, topic: str) -> Subscription:
+        ws = await websockets.connect(self.url)
+        await ws.send(f"{SUBSCRIBE}#{topic}")
+        return RelaySubscription(ws)
+
+
+class SqliteBroker(Broker):
+    """Verteilt über die Tabelle ``brokermessage`` der gemeinsamen Datenbank.
+
+    Je Prozess fragt ein Task neue Zeilen ab, solange es Abonnenten gibt, und
+    verteilt sie über einen eigenen Hub. Alte Zeilen werden dabei gelöscht.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL, retention: float = RETENTION):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.local = Hub()
+        self.task: Optional[asyncio.Task] = None
+        self.last_id: Optional[int] = None
+        self.cleaned_at = 0.0
+
+    async def publish(self, topic: str, message: str):
+        await asyncio.to_thread(self._insert, topic, message)
+
+    def _insert(self, topic: str, message: str):
+        with db.session() as session:
+            session.add(BrokerMessage(topic=topic, message=message, time=datetime.now()))
+            session.commit()
+
+    async def subscribe(self, topic: str) -> Subscription:
+        if self.last_id is None:
+            # Erst ab jetzt zustellen, nicht den Bestand der Tabelle
+            self.last_id = await asyncio.to_thread(self._max_id)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._poll())
+        return QueueSubscription(self.local, topic)
+
+    def _max_id(self) -> int:
+        with db.session() as session:
+            return session.exec(select(func.max(BrokerMessage.id))).one() or 0
+
+    def _fetch(self) -> list:
+        with db.session() as session:
+            rows = session.exec(
+                select(BrokerMessage.id, BrokerMessage.topic, BrokerMessage.message)
+                .where(BrokerMessage.id > self.last_id)
+                .order_by(BrokerMessage.id)
+            ).all()
+            if time.monotonic() - self.cleaned_at > self.retention:
+                self.cleaned_at = time.monotonic()
+                session.exec(delete(BrokerMessage).where(
+                    BrokerMessage.time < datetime.now() - timedelta(seconds=self.retention)))
+                session.commit()
+        return rows
+
+    async def _poll(self):
+        while self.local.topics:
+            try:
+                for id, topic, message in await asyncio.to_thread(self._fetch):
+                    self.last_id = id
+                    await self.local.publish(topic, message)
+            except Exception as e:
+                print(f"Error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+        self.last_id = None
+
+
+class RedisSubscription(Subscription):
+    """Abonnement bei Redis; bricht die Verbindung ab, löst ``receive`` den Fehler aus.
+
+    Wie beim Relay abonniert dann der Aufrufer neu (siehe ``AuctionListener.run``
+    und ``invalidation_task``) und holt Verpasstes nach.
+    """
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+        self.outbox = Outbox()
+        self.error: Optional[Exception] = None
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for item in self.pubsub.listen():
+                if item["type"] in ("message", "pmessage"):
+                    data = item["data"]
+                    self.outbox.put(data.decode() if isinstance(data, bytes) else data)
+            self.error = ConnectionError("Redis-Abonnement beendet")
+        except Exception as e:
+            self.error = e
+        self.outbox.ready.set()
+
+    async def receive(self) -> str:
+        while not self.outbox.messages:
+            if self.error is not None:
+                raise self.error
+            self.outbox.ready.clear()
+            await self.outbox.ready.wait()
+        return self.outbox.messages.popleft()
+
+    async def close(self):
+        self.task.cancel()
+        try:
+            await self.pubsub.reset()
+        except Exception:
+            pass
+
+
+class RedisBroker(Broker):
+    """Verteilt über Redis Pub/Sub, auch über mehrere Rechner."""
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("CROWDBID_BROKER=redis benötigt das Paket redis")
+        self.client = aioredis.from_url(url)
+
+    async def publish(self, topic: str, message: str):
+        await self.client.publish(topic, message)
+
+    async def subscribe(self, topic: str) -> Subscription:
+        pubsub = self.client.pubsub()
+        if topic == ALL_TOPICS:
+            await pubsub.psubscribe("*")
+        else:
+            await pubsub.subscribe(topic)
+        return RedisSubscription(pubsub)
+
+
+def make_broker(name: str) -> Broker:
+    if name == "memory":
+        return MemoryBroker()
+    if name == "relay":
+        return RelayBroker(RELAY_URL or f"ws://{RELAY_HOST}:{RELAY_PORT}")
+    if name == "sqlite":
+        return SqliteBroker()
+    if name == "redis":
+        return RedisBroker(REDIS_URL)
+    raise ValueError(f"Unbekannter Broker: {name}")
+
+
+_broker: Optional[Broker] = None
+
+
+def get_broker() -> Broker:
+    """Der Broker des Prozesses, gewählt über CROWDBID_BROKER."""
+    global _broker
+    if _broker is None:
+        _broker = make_broker(BROKER)
+    return _broker
+
+
+async def publish(topic: str, text: str = ""):
+    """Veröffentlicht eine Nachricht für alle Abonnenten des Themas."""
+    await get_broker().publish(topic, f"{topic}#{text}")
+
+
+async def notify(ida: int, payload: Optional[str]):
+    """Veröffentlicht ein protokolliertes Ereignis der Auktion; aufzurufen nach dem Commit, im Backend.
+
+    Ein Fehler beim Verteilen geht nicht an den Aufrufer: die Sitzungen holen
+    das Ereignis später per ``event_log.since`` nach.
+    """
+    if payload is None:
+        return
+    try:
+        await publish(topic_for(ida), payload)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+
+async def batches(receive: Callable[[], Awaitable[str]], window: float) -> AsyncIterator[List[str]]:
+    """Fasst die Nachrichten zusammen, die bis ``window`` Sekunden nach der ersten eintreffen."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await receive()]
+        deadline = loop.time() + window
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                batch.append(await asyncio.wait_for(receive(), remaining))
+            except asyncio.TimeoutError:
+                break
+        yield batch
+
+
+async def listen(topic: str, window: float = COALESCE_WINDOW,
+                 on_subscribe: Optional[Callable[[], None]] = None) -> AsyncIterator[List[str]]:
+    """Liefert die Nachrichten zum Thema in Stapeln (siehe ``batches``), solange der Aufrufer iteriert.
+
+    ``on_subscribe`` wird aufgerufen, sobald das Abonnement besteht.
+    """
+    subscription = await get_broker().subscribe(topic)
+    if on_subscribe is not None:
+        on_subscribe()
+    try:
+        async for batch in batches(subscription.receive, window):
+            yield batch
+    finally:
+        await subscription.close()
+
+
+async def invalidation_task():
+    """Lifespan-Task: verwirft die Zwischenspeicher, wenn ein anderer Worker eine Auktion ändert."""
+    if not get_broker().remote:
+        return
+    subscribed = False
+
+    def on_subscribe():
+        # Was während der Unterbrechung geändert wurde, ist unbekannt: alles verwerfen
+        nonlocal subscribed
+        if subscribed:
+            pivot_cache.clear()
+            auction_cache.clear()
+        subscribed = True
+
+    while True:
+        try:
+            async for batch in listen(ALL_TOPICS, window=0, on_subscribe=on_subscribe):
+                for message in batch:
+                    topic, _, payload = message.partition("#")
+                    ida = auction_for(topic)
+                    if ida is not None:
+                        pivot_cache.invalidate(ida)
+                        if events.decode(payload)["kind"] in (events.ROUND_END, events.RELOAD):
+                            auction_cache.invalidate(ida)
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            await asyncio.sleep(2)
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlmodel import select
+
+from CrowdBid import metrics
+from CrowdBid.models import Auction, Bid
+from CrowdBid.pivot import BidPivot
+
+# Einträge des Token-Zwischenspeichers und deren Gültigkeit in Sekunden
+AUCTION_CACHE_SIZE = int(os.environ.get("CROWDBID_AUCTION_CACHE_SIZE", "1000"))
+AUCTION_CACHE_TTL = float(os.environ.get("CROWDBID_AUCTION_CACHE_TTL", "60"))
+# Gesamtzahlen der Auktionsliste: Anzahl der Filter und Gültigkeit in Sekunden
+COUNT_CACHE_SIZE = int(os.environ.get("CROWDBID_COUNT_CACHE_SIZE", "1000"))
+COUNT_CACHE_TTL = float(os.environ.get("CROWDBID_COUNT_CACHE_TTL", "30"))
+
+
+class PivotCache:
+    """Prozessweiter Zwischenspeicher der Gebotstabelle je Auktion.
+
+    Jede Änderung an einer Auktion erhöht deren Version; die Tabelle wird beim
+    nächsten Zugriff einmal neu aufgebaut und von allen Sitzungen geteilt.
+    Sitzungen dürfen den geteilten Stand nicht verändern (siehe ``BidPivot.copy``).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions: Dict[int, int] = defaultdict(int)
+        self.entries: Dict[int, Tuple[int, BidPivot]] = {}
+
+    def get(self, session, auction) -> BidPivot:
+        with self.lock:
+            version = self.versions[auction.id]
+            entry = self.entries.get(auction.id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        # Version vor den Geboten lesen: spätere Ereignisse werden dann ggf. doppelt
+        # eingearbeitet (harmlos), aber keines übersehen
+        seq = session.exec(select(Auction.version).where(Auction.id == auction.id)).one_or_none()
+        bids = session.exec(select(Bid).where(Bid.ida == auction.id)).all()
+        pivot = BidPivot.from_bids(auction, bids)
+        pivot.seq = seq
+        pivot.shared = True
+        with self.lock:
+            # Nur speichern, wenn zwischendurch keine Änderung eingetroffen ist
+            if self.versions[auction.id] == version:
+                self.entries[auction.id] = (version, pivot)
+        return pivot
+
+    def invalidate(self, auction_id: int):
+        with self.lock:
+            self.versions[auction_id] += 1
+            self.entries.pop(auction_id, None)
+
+    def clear(self):
+        with self.lock:
+            for auction_id in list(self.versions):
+                self.versions[auction_id] += 1
+            self.entries.clear()
+
+
+class AuctionCache:
+    """Prozessweiter LRU-Zwischenspeicher für die Auflösung von ``token`` und ``config_token``.
+
+    Einträge verfallen nach ``ttl`` Sekunden. Änderungen an einer Auktion
+    verwerfen deren Einträge sofort (``invalidate``); Änderungen in anderen
+    Worker-Prozessen wirken spätestens nach ``ttl``. Gespeichert werden nur die
+    Spaltenwerte, jeder Aufrufer erhält ein eigenes ``Auction``-Objekt.
+    """
+
+    def __init__(self, size: int = AUCTION_CACHE_SIZE, ttl: float = AUCTION_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Tuple[str, str], Tuple[float, dict]] = OrderedDict()
+        self.keys: Dict[int, Set[Tuple[str, str]]] = defaultdict(set)  # Schlüssel je Auktion
+        self.generation = 0
+
+    def by_token(self, session, token: str) -> Optional[Auction]:
+        return self.get(session, "token", token)
+
+    def by_config_token(self, session, config_token: str) -> Optional[Auction]:
+        return self.get(session, "config_token", config_token)
+
+    def get(self, session, column: str, value: str) -> Optional[Auction]:
+        key = (column, value)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                metrics.AUCTION_CACHE_HITS.inc()
+                return Auction(**entry[1])
+            generation = self.generation
+        metrics.AUCTION_CACHE_MISSES.inc()
+        auction = session.exec(select(Auction).where(getattr(Auction, column) == value)).first()
+        if auction is None:
+            return None
+        with self.lock:
+            # Nur speichern, wenn zwischendurch nichts verworfen wurde
+            if self.generation == generation:
+                self._store(key, auction.model_dump(), now + self.ttl)
+        return auction
+
+    def _store(self, key: Tuple[str, str], data: dict, expires: float):
+        self.entries[key] = (expires, data)
+        self.entries.move_to_end(key)
+        self.keys[data["id"]].add(key)
+        while len(self.entries) > self.size:
+            old_key, (_, old) = self.entries.popitem(last=False)
+            keys = self.keys.get(old["id"])
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self.keys[old["id"]]
+
+    def invalidate(self, auction_id: int):
+        with self.lock:
+            self.generation += 1
+            for key in self.keys.pop(auction_id, ()):
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.keys.clear()
+
+
+class CountCache:
+    """LRU-Zwischenspeicher der Gesamtzahl der Auktionsliste je Filter, siehe ``auction_list.count_auctions``.
+
+    Einträge verfallen nach ``ttl`` Sekunden; mehr als ``size`` Filter werden
+    nicht gehalten, der am längsten ungenutzte fällt heraus.
+    """
+
+    def __init__(self, size: int = COUNT_CACHE_SIZE, ttl: float = COUNT_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple, Tuple[float, int]] = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[int]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, count: int):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, count)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+pivot_cache = PivotCache()
+auction_cache = AuctionCache()
+count_cache = CountCache()
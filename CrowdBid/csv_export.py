@@ -0,0 +1,52 @@
+from datetime import datetime
+from itertools import groupby
+from typing import Iterator
+
+from sqlmodel import select
+
+from CrowdBid import db, metrics
+from CrowdBid.models import Bid, LatestBid
+
+YIELD_PER = 1000
+
+
+def export_filename(prefix: str, topic: str) -> str:
+    return f"{prefix}_{topic.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+
+@metrics.timed("export_csv")
+def bid_lines(ida: int) -> Iterator[str]:
+    """Liefert die Gebotstabelle einer Auktion zeilenweise: ``Name;R1;R2;...``.
+
+    Die Gebote werden nach (Name, Runde) sortiert blockweise gelesen, im
+    Speicher liegt also immer nur ein Bietender.
+    """
+    with db.session() as session:
+        rows = session.exec(
+            select(Bid.name, Bid.round, Bid.bid)
+            .where(Bid.ida == ida)
+            .order_by(Bid.name, Bid.round)
+            .execution_options(yield_per=YIELD_PER)
+        )
+        for name, bids in groupby(rows, key=lambda row: row[0]):
+            bids_list = []
+            for _, round, bid in bids:
+                if round > 0:
+                    while len(bids_list) < round - 1:
+                        bids_list.append("")
+                    bids_list.append(f"{bid}")
+            yield f"{name};{';'.join(bids_list)}\n"
+
+
+@metrics.timed("export_result_csv")
+def result_lines(ida: int) -> Iterator[str]:
+    """Liefert das Ergebnis einer Auktion zeilenweise: ``Name;letztes Gebot`` (aus ``LatestBid``)."""
+    with db.session() as session:
+        rows = session.exec(
+            select(LatestBid.name, LatestBid.bid)
+            .where(LatestBid.ida == ida)
+            .order_by(LatestBid.name)
+            .execution_options(yield_per=YIELD_PER)
+        )
+        for name, bid in rows:
+            yield f"{name};{bid}\n"
@@ -0,0 +1,189 @@
+import codecs
+import csv
+import secrets
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, literal
+from sqlmodel import select
+
+from CrowdBid import db, event_log, events, summary
+from CrowdBid.models import Bid, ImportRow
+from CrowdBid.writes import bump_version
+
+CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+
+Row = Tuple[str, List[Tuple[int, float]]]
+
+
+def parse_row(parts: List[str], require_bids: bool = True) -> Optional[Row]:
+    """Wandelt eine CSV-Zeile ``Name;Gebot R1;Gebot R2;...`` in ``(Name, [(Runde, Gebot), ...])``."""
+    if not parts or (require_bids and len(parts) < 2):  # Mindestens Name und ein Gebot
+        return None
+    name = parts[0].strip()
+    bids = []
+    for i, bid_str in enumerate(parts[1:], 1):
+        if bid_str.strip():  # Nur nicht-leere Gebote
+            try:
+                bids.append((i, float(bid_str.strip())))
+            except ValueError:
+                continue
+    if require_bids and not bids:  # Nur wenn mindestens ein Gebot vorhanden ist
+        return None
+    return name, bids
+
+
+def parse_lines(lines: Iterable[str], require_bids: bool = True) -> Iterator[Row]:
+    for parts in csv.reader(lines, delimiter=";"):
+        row = parse_row(parts, require_bids)
+        if row is not None:
+            yield row
+
+
+async def parse_upload(file, read_size: int = READ_SIZE) -> AsyncIterator[Row]:
+    """Liest eine hochgeladene Datei blockweise und liefert die gültigen Zeilen.
+
+    Es wird immer nur ein Block der Datei dekodiert und geparst, der Speicherbedarf
+    hängt also nicht von der Dateigröße ab.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    while chunk := await file.read(read_size):
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for row in parse_lines(lines):
+            yield row
+    pending += decoder.decode(b"", final=True)
+    for row in parse_lines([pending]):
+        yield row
+
+
+def bid_rows(name: str, bids: List[Tuple[int, float]], **columns) -> List[dict]:
+    """Die Zeilen eines Bietenden; ``columns`` (z.B. ``ida``) kommen in jede Zeile."""
+    # Dummy-Eintrag für Runde 0 (zum Hinzufügen des Bieters)
+    rows = [{"name": name, "round": 0, "bid": 0, **columns}]
+    rows.extend({"name": name, "round": round_num, "bid": bid_value, **columns} for round_num, bid_value in bids)
+    return rows
+
+
+class BulkWriter:
+    """Ersetzt alle Gebote einer Auktion durch neu eingelesene Zeilen.
+
+    Löscht die vorhandenen Gebote mit einem einzigen DELETE und schreibt die
+    neuen blockweise per executemany. Das Commit bleibt beim Aufrufer.
+    """
+
+    def __init__(self, session, ida: int, chunk_size: int = CHUNK_SIZE):
+        self.session = session
+        self.ida = ida
+        self.chunk_size = chunk_size
+        self.time = datetime.now()
+        self.rows = []
+        self.bidders = 0
+        self.written = 0
+        seq = bump_version(session, ida)
+        session.exec(delete(Bid).where(Bid.ida == ida))
+        # Veröffentlicht erst der Aufrufer nach dem Commit
+        self.payload = event_log.record(session, ida, seq, events.RELOAD, "Die Gebote wurden neu importiert.")
+
+    def add(self, name: str, bids: List[Tuple[int, float]], flush: bool = True) -> bool:
+        """Nimmt einen Bietenden auf; ``True``, wenn dabei ein Block geschrieben wurde.
+
+        Mit ``flush=False`` heißt ``True`` nur, dass ein Block voll ist; der
+        Aufrufer schreibt ihn selbst (z.B. per ``db.run(writer.flush)``).
+        """
+        self.bidders += 1
+        self.rows.extend(bid_rows(name, bids, ida=self.ida, time=self.time))
+        if len(self.rows) >= self.chunk_size:
+            if flush:
+                self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if self.rows:
+            # Core-Insert: ohne den Umweg über die ORM-Massenverarbeitung je Zeile
+            self.session.connection().execute(insert(Bid.__table__), self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+    def finish(self):
+        """Schreibt den letzten Block und baut die Zusammenfassungen der Auktion neu auf."""
+        self.flush()
+        summary.rebuild(self.session, self.ida)
+
+
+class StagedImport:
+    """Importiert einen Upload, ohne die Schreibsperre während des Lesens zu halten.
+
+    Jeder Block geht in einer eigenen kurzen Transaktion nach ``ImportRow``;
+    ``finish`` ersetzt dann in einer Transaktion alle Gebote der Auktion per
+    ``INSERT ... SELECT``. Bis dahin sehen alle den alten Stand, ein
+    abgebrochener Upload ändert nichts. ``discard`` räumt die Zwischenablage
+    auf (nach ``finish`` ist sie schon leer). Die Methoden öffnen eigene
+    Sitzungen und sind per ``db.run`` aufzurufen.
+    """
+
+    def __init__(self, ida: int, chunk_size: int = CHUNK_SIZE):
+        self.ida = ida
+        self.chunk_size = chunk_size
+        self.upload = secrets.token_hex(8)
+        self.rows = []
+        self.bidders = 0
+        self.written = 0
+        self.payload = None
+
+    def add(self, name: str, bids: List[Tuple[int, float]]) -> bool:
+        """Nimmt einen Bietenden auf; ``True``, wenn ein Block voll ist (dann ``flush``)."""
+        self.bidders += 1
+        self.rows.extend(bid_rows(name, bids, upload=self.upload, ida=self.ida))
+        return len(self.rows) >= self.chunk_size
+
+    def flush(self):
+        if not self.rows:
+            return
+        with db.session() as session:
+            db.begin_write(session)
+            session.connection().execute(insert(ImportRow.__table__), self.rows)
+            session.commit()
+        self.written += len(self.rows)
+        self.rows = []
+
+    def finish(self) -> str:
+        """Übernimmt die zwischengespeicherten Zeilen und liefert das protokollierte Ereignis."""
+        self.flush()
+        with db.session() as session:
+            seq = bump_version(session, self.ida)
+            session.exec(delete(Bid).where(Bid.ida == self.ida))
+            session.exec(insert(Bid).from_select(
+                ["ida", "name", "round", "bid", "time"],
+                select(ImportRow.ida, ImportRow.name, ImportRow.round, ImportRow.bid, literal(datetime.now()))
+                .where(ImportRow.upload == self.upload),
+            ))
+            session.exec(delete(ImportRow).where(ImportRow.upload == self.upload))
+            summary.rebuild(session, self.ida)
+            # Veröffentlicht erst der Aufrufer nach dem Commit
+            self.payload = event_log.record(session, self.ida, seq, events.RELOAD, "Die Gebote wurden neu importiert.")
+            session.commit()
+        return self.payload
+
+    def discard(self):
+        with db.session() as session:
+            session.exec(delete(ImportRow).where(ImportRow.upload == self.upload))
+            session.commit()
+
+
+def import_bids(session, ida: int, imported_data: Iterable[Row],
+                chunk_size: int = CHUNK_SIZE) -> Iterator[BulkWriter]:
+    """Schreibt ``imported_data`` mit einem ``BulkWriter``.
+
+    Nach jedem Block wird der Writer geliefert (``bidders``, ``written`` und
+    das protokollierte Ereignis ``payload``).
+    """
+    writer = BulkWriter(session, ida, chunk_size)
+    for name, bids in imported_data:
+        if writer.add(name, bids):
+            yield writer
+    writer.finish()
+    yield writer
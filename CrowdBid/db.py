@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+import sqlalchemy
+import sqlmodel
+from sqlalchemy.dialects import postgresql, sqlite
+from reflex.config import get_config
+
+from CrowdBid import metrics
+
+# Werden für jede neue SQLite-Verbindung gesetzt. WAL erlaubt Lesen während
+# geschrieben wird, busy_timeout wartet auf die Schreibsperre statt sofort mit
+# "database is locked" abzubrechen.
+SQLITE_PRAGMAS: Dict[str, str] = {
+    "journal_mode": os.environ.get("CROWDBID_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("CROWDBID_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.environ.get("CROWDBID_SQLITE_BUSY_TIMEOUT", "5000"),  # ms
+    "cache_size": os.environ.get("CROWDBID_SQLITE_CACHE_SIZE", "-20000"),  # negativ = KiB
+    "mmap_size": os.environ.get("CROWDBID_SQLITE_MMAP_SIZE", "268435456"),  # 256 MiB
+}
+
+# Dialekte mit INSERT ... ON CONFLICT DO UPDATE; andere schreiben in zwei Schritten
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Sekunden, die ein Schreibzugriff insgesamt auf die Schreibsperre wartet; der
+# Busy-Handler von SQLite reiht die Wartenden nicht ein, einzelne gingen sonst
+# nach busy_timeout leer aus
+WRITE_WAIT = float(os.environ.get("CROWDBID_SQLITE_WRITE_WAIT", "30"))
+
+POOL_SIZE = int(os.environ.get("CROWDBID_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("CROWDBID_DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.environ.get("CROWDBID_DB_POOL_TIMEOUT", "30"))
+# Threads für ``run``; nicht mehr als Verbindungen im Pool, sonst warten sie dort
+THREADS = int(os.environ.get("CROWDBID_DB_THREADS", str(POOL_SIZE)))
+
+_engine: Optional[sqlalchemy.engine.Engine] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+
+def make_engine(url: str, pragmas: Optional[Dict[str, str]] = None, **kwargs) -> sqlalchemy.engine.Engine:
+    """Erzeugt eine Engine; für SQLite werden die Pragmas beim Verbinden gesetzt."""
+    if url.startswith("sqlite"):
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    engine = sqlalchemy.create_engine(url, **kwargs)
+    if url.startswith("sqlite") and pragmas:
+
+        @sqlalchemy.event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return engine
+
+
+def get_engine() -> sqlalchemy.engine.Engine:
+    global _engine
+    if _engine is None:
+        _engine = make_engine(
+            get_config().db_url,
+            SQLITE_PRAGMAS,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+        )
+        metrics.instrument_db(_engine, sqlmodel.Session)
+    return _engine
+
+
+def begin_write(session):
+    """Beginnt unter SQLite die Transaktion mit ``BEGIN IMMEDIATE``, also gleich mit der Schreibsperre.
+
+    Muss vor der ersten Anweisung der Transaktion stehen (siehe
+    ``writes.bump_version``). Ist die Sperre nach busy_timeout nicht frei, wird
+    mit wachsender, zufälliger Pause erneut versucht, bis WRITE_WAIT verstrichen ist.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite" or connection.connection.dbapi_connection.in_transaction:
+        return
+    deadline = time.monotonic() + WRITE_WAIT
+    pause = 0.005
+    while True:
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except sqlalchemy.exc.OperationalError as e:
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
+            time.sleep(random.uniform(0, pause))
+            pause = min(pause * 2, 0.1)
+
+
+def session() -> sqlmodel.Session:
+    """Ersatz für ``rx.session()`` mit der abgestimmten Engine."""
+    metrics.DB_SESSIONS.inc()
+    return sqlmodel.Session(get_engine())
+
+
+async def run(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Führt ``fn`` (synchroner Datenbankzugriff) in einem der THREADS Threads aus.
+
+    Die Event-Handler warten darauf, ohne die Event-Schleife zu blockieren, die
+    alle WebSockets bedient.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="crowdbid-db")
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,79 @@
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import func, select
+
+from CrowdBid import events
+from CrowdBid.models import Auction, AuctionEvent, AuctionSnapshot, Bid
+
+# Höchstens so viele Ereignisse werden nachgeholt, bei mehr wird neu geladen
+REPLAY_LIMIT = int(os.environ.get("CROWDBID_EVENT_REPLAY_LIMIT", "500"))
+
+
+def record(session, ida: int, seq: int, kind: str, text: str = "", **data) -> str:
+    """Schreibt das Ereignis zur Version ``seq`` (siehe ``writes.bump_version``) ins Protokoll.
+
+    Das Ereignis gehört zur laufenden Transaktion, das Commit bleibt beim
+    Aufrufer. Liefert den Nachrichtentext zum Veröffentlichen.
+    """
+    payload = events.encode(kind, text, seq=seq, **data)
+    session.add(AuctionEvent(ida=ida, seq=seq, kind=kind, payload=payload, time=datetime.now()))
+    return payload
+
+
+def since(session, ida: int, seq: int) -> Optional[List[str]]:
+    """Die Ereignisse nach Version ``seq`` in Reihenfolge.
+
+    ``None`` heißt: neu laden. So ist es, wenn ``seq`` vor dem ältesten
+    erhaltenen Ereignis liegt (das Protokoll ist kompaktiert, siehe ``fold``,
+    oder reicht nicht bis vor seine Einführung zurück), wenn Ereignisse fehlen
+    oder wenn es mehr als ``REPLAY_LIMIT`` sind.
+    """
+    # Version zuerst lesen: was danach geschrieben wird, steht ggf. zusätzlich in den Zeilen
+    version, oldest = session.exec(
+        select(Auction.version, select(func.min(AuctionEvent.seq)).where(AuctionEvent.ida == ida).scalar_subquery())
+        .where(Auction.id == ida)
+    ).one_or_none() or (None, None)
+    if version is None:
+        return None
+    if seq < version and (oldest is None or oldest > seq + 1):
+        return None  # vor dem ältesten erhaltenen Ereignis
+    rows = session.exec(
+        select(AuctionEvent.seq, AuctionEvent.payload)
+        .where((AuctionEvent.ida == ida) & (AuctionEvent.seq > seq))
+        .order_by(AuctionEvent.seq)
+        .limit(REPLAY_LIMIT + 1)
+    ).all()
+    if len(rows) > REPLAY_LIMIT or seq + len(rows) < version:
+        return None
+    if any(row_seq != seq + i for i, (row_seq, _) in enumerate(rows, start=1)):
+        return None
+    return [payload for _, payload in rows]
+
+
+def fold(session, ida: int, cutoff: datetime) -> int:
+    """Fasst die Ereignisse vor ``cutoff`` in einem ``AuctionSnapshot`` zusammen und entfernt sie.
+
+    Der Snapshot hält den Stand der Auktion zur aktuellen Version und die
+    entfernten Ereignisse, der Verlauf bleibt also nachvollziehbar. Aufzurufen
+    in einer Schreibtransaktion (``db.begin_write``), damit Stand und Version
+    zusammenpassen; das Commit bleibt beim Aufrufer. Liefert die Zahl der
+    entfernten Ereignisse.
+    """
+    folded = session.exec(
+        select(AuctionEvent.payload)
+        .where((AuctionEvent.ida == ida) & (AuctionEvent.time < cutoff))
+        .order_by(AuctionEvent.seq)
+    ).all()
+    if not folded:
+        return 0
+    version, last_round = session.exec(select(Auction.version, Auction.last_round).where(Auction.id == ida)).one()
+    bids = session.exec(select(Bid.name, Bid.round, Bid.bid).where(Bid.ida == ida).order_by(Bid.name, Bid.round)).all()
+    state = {"last_round": last_round, "bids": [list(row) for row in bids]}
+    session.add(AuctionSnapshot(ida=ida, seq=version, state=json.dumps(state, ensure_ascii=False),
+                                events=json.dumps(list(folded), ensure_ascii=False), time=datetime.now()))
+    session.exec(delete(AuctionEvent).where((AuctionEvent.ida == ida) & (AuctionEvent.time < cutoff)))
+    return len(folded)
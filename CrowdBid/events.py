@@ -0,0 +1,38 @@
+import json
+from typing import List
+
+# Arten der Änderungsereignisse einer Auktion
+BID = "bid"
+ADD = "add"
+RENAME = "rename"
+ROUND_END = "round_end"
+RELOAD = "reload"
+EDIT = "edit"  # Änderung auf der Datenseite
+# Nur innerhalb eines Workers: das Abonnement wurde neu aufgebaut, verpasste
+# Ereignisse müssen aus dem Protokoll nachgeholt werden (siehe listeners.py)
+RESUME = "resume"
+
+
+def encode(kind: str, text: str = "", **data) -> str:
+    """Erzeugt den Nachrichtentext für ein Ereignis, z.B. ``encode(BID, name="Max", round=2, bid=50.0)``."""
+    return json.dumps({"kind": kind, "text": text, **data})
+
+
+def join_texts(texts: List[str], limit: int = 3) -> str:
+    """Fasst die Hinweistexte eines Stapels zu einer Meldung zusammen."""
+    texts = list(dict.fromkeys(texts))
+    if len(texts) > limit:
+        return "\n".join(texts[:limit]) + f"\n… und {len(texts) - limit} weitere"
+    return "\n".join(texts)
+
+
+def decode(payload: str) -> dict:
+    """Liest ein Ereignis; reiner Text (ältere Sender) wird als Neuladen behandelt."""
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict) or "kind" not in event:
+        return {"kind": RELOAD, "text": payload}
+    event.setdefault("text", "")
+    return event
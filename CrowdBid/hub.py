@@ -0,0 +1,189 @@
+import asyncio
+import os
+from collections import defaultdict, deque
+from typing import Optional
+
+from websockets.exceptions import ConnectionClosed
+
+from CrowdBid import events, metrics
+
+# Nachrichten haben die Form "<topic>#<text>", z.B. "A17#Neuer Bietende: Max".
+# Ein Client abonniert ein Thema mit "SUB#A17" und erhält danach nur noch
+# Nachrichten dieses Themas; "SUB#*" abonniert alle Themen.
+SUBSCRIBE = "SUB"
+UNSUBSCRIBE = "UNSUB"
+ALL_TOPICS = "*"
+
+RELAY_HOST = "127.0.0.1"
+RELAY_PORT = 28765
+
+# Ausstehende Nachrichten je Empfänger; läuft die Warteschlange über, wird sie
+# durch eine RELOAD-Nachricht je Thema ersetzt
+OUTBOX_SIZE = int(os.environ.get("CROWDBID_RELAY_OUTBOX", "100"))
+# Sekunden, die eine einzelne Sendung dauern darf, bevor der Client getrennt wird
+SEND_TIMEOUT = float(os.environ.get("CROWDBID_RELAY_SEND_TIMEOUT", "10"))
+# Heartbeat des Relays; eine tote Verbindung wird nach Intervall + Timeout
+# geschlossen und spätestens nach weiteren CLOSE_TIMEOUT Sekunden abgebrochen
+PING_INTERVAL = float(os.environ.get("CROWDBID_RELAY_PING_INTERVAL", "20")) or None
+PING_TIMEOUT = float(os.environ.get("CROWDBID_RELAY_PING_TIMEOUT", "20")) or None
+CLOSE_TIMEOUT = float(os.environ.get("CROWDBID_RELAY_CLOSE_TIMEOUT", "5"))
+
+
+def topic_for(auction_id: int) -> str:
+    """Liefert das Thema, unter dem die Nachrichten einer Auktion laufen."""
+    return f"A{auction_id}"
+
+
+def auction_for(topic: str) -> Optional[int]:
+    """Umkehrung von ``topic_for``; ``None`` für fremde Themen."""
+    if topic.startswith("A") and topic[1:].isdigit():
+        return int(topic[1:])
+    return None
+
+
+class Outbox:
+    """Begrenzte Warteschlange der ausstehenden Nachrichten eines Empfängers.
+
+    Läuft sie über, werden die wartenden Nachrichten verworfen und je Thema durch
+    eine RELOAD-Nachricht ersetzt. Ein langsamer Empfänger lädt dann einmal neu,
+    statt jede einzelne Änderung nachzuholen.
+    """
+
+    def __init__(self, maxsize: int = OUTBOX_SIZE):
+        self.maxsize = maxsize
+        self.messages: deque[str] = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, message: str):
+        if len(self.messages) >= self.maxsize:
+            topics = dict.fromkeys(m.partition("#")[0] for m in self.messages)
+            topics[message.partition("#")[0]] = None
+            self.dropped += len(self.messages) + 1
+            metrics.RELAY_DROPPED_MESSAGES.inc(len(self.messages) + 1)
+            self.messages.clear()
+            for topic in topics:
+                self.messages.append(f"{topic}#{events.encode(events.RELOAD)}")
+        else:
+            self.messages.append(message)
+        self.ready.set()
+
+    async def get(self) -> str:
+        while not self.messages:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.messages.popleft()
+
+
+class SocketClient:
+    """WebSocket-Client am Relay mit eigener Warteschlange und Schreib-Task.
+
+    ``send`` legt nur in die Warteschlange; geschrieben wird nebenläufig, ein
+    langsamer Client hält also weder den Sender noch die anderen Clients auf.
+    Dauert eine Sendung länger als ``send_timeout``, wird der Client getrennt.
+    """
+
+    def __init__(self, websocket, hub: "Hub"):
+        self.websocket = websocket
+        self.hub = hub
+        self.outbox = Outbox(hub.outbox_size)
+        self.task = asyncio.create_task(self.write())
+
+    async def send(self, message: str):
+        self.outbox.put(message)
+
+    async def write(self):
+        try:
+            while True:
+                message = await self.outbox.get()
+                with metrics.RELAY_SEND_SECONDS.time():
+                    await asyncio.wait_for(self.websocket.send(message), self.hub.send_timeout)
+        except (ConnectionClosed, asyncio.TimeoutError):
+            metrics.RELAY_DROPPED.inc()
+            self.hub.unsubscribe(self)
+            await self.websocket.close()
+
+
+class Hub:
+    """Verteilt Nachrichten nur an die Abonnenten des jeweiligen Themas."""
+
+    def __init__(self, outbox_size: int = OUTBOX_SIZE, send_timeout: float = SEND_TIMEOUT):
+        self.topics: dict[str, set] = defaultdict(set)
+        self.subscriptions: dict[object, set[str]] = defaultdict(set)
+        self.outbox_size = outbox_size
+        self.send_timeout = send_timeout
+
+    def subscribe(self, client, topic: str):
+        self.topics[topic].add(client)
+        self.subscriptions[client].add(topic)
+
+    def unsubscribe(self, client, topic: Optional[str] = None):
+        """Entfernt ein Abonnement, ohne Thema alle Abonnements des Clients."""
+        topics = [topic] if topic is not None else list(self.subscriptions.get(client, ()))
+        for t in topics:
+            subscribers = self.topics.get(t)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.topics[t]
+            if client in self.subscriptions:
+                self.subscriptions[client].discard(t)
+        if not self.subscriptions.get(client):
+            self.subscriptions.pop(client, None)
+
+    async def publish(self, topic: str, message: str, sender=None) -> int:
+        """Sendet die Nachricht an alle Abonnenten des Themas (außer dem Sender).
+
+        Gibt die Anzahl der erreichten Clients zurück. Bei ``SocketClient`` und
+        ``QueueSubscriber`` wird dabei nur in deren Warteschlange gelegt.
+        """
+        sent = 0
+        clients = self.topics.get(topic, set())
+        if ALL_TOPICS in self.topics:
+            clients = clients | self.topics[ALL_TOPICS]
+        for client in list(clients):
+            if client is sender:
+                continue
+            try:
+                await client.send(message)
+                sent += 1
+            except ConnectionClosed:
+                self.unsubscribe(client)
+                metrics.RELAY_DROPPED.inc()
+        metrics.RELAY_FANOUT.observe(sent)
+        return sent
+
+    async def handle(self, websocket):
+        """Verbindungs-Handler für ``websockets.serve``."""
+        client = SocketClient(websocket, self)
+        metrics.RELAY_CLIENTS.inc()
+        try:
+            async for message in websocket:
+                topic, _, text = message.partition("#")
+                if topic == SUBSCRIBE:
+                    self.subscribe(client, text)
+                elif topic == UNSUBSCRIBE:
+                    self.unsubscribe(client, text)
+                else:
+                    await self.publish(topic, message, sender=client)
+                    # Den Schreib-Tasks Gelegenheit geben, bevor die nächste Nachricht verteilt wird
+                    await asyncio.sleep(0)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.unsubscribe(client)
+            client.task.cancel()
+            metrics.RELAY_CLIENTS.dec()
+
+
+class QueueSubscriber:
+    """In-Process-Abonnent mit begrenzter Warteschlange (siehe ``Outbox``)."""
+
+    def __init__(self):
+        self.outbox = Outbox()
+
+    async def send(self, message: str):
+        self.outbox.put(message)
+
+
+hub = Hub()
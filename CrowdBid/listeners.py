@@ -0,0 +1,125 @@
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional
+
+from CrowdBid import events
+from CrowdBid.broker import listen
+from CrowdBid.hub import Outbox, topic_for
+
+# Sekunden zwischen zwei Prüfungen, ob die Sitzungen noch verbunden sind; eine
+# Sitzung wird erst nach zwei Prüfungen ohne Verbindung abgemeldet
+SWEEP_INTERVAL = float(os.environ.get("CROWDBID_LISTENER_SWEEP", "15"))
+# Wartezeit bis zum erneuten Abonnieren, wenn die Verbindung zum Broker abbricht
+RECONNECT_DELAY = 2.0
+
+
+class Feed:
+    """Ereignisse einer Auktion für eine Sitzung (einen Browser-Tab)."""
+
+    def __init__(self):
+        self.outbox = Outbox()
+        self.closed = False
+        self.missed = 0  # Prüfungen in Folge ohne Verbindung
+
+    async def next_batch(self) -> Optional[List[str]]:
+        """Alle bis jetzt eingetroffenen Nachrichten; ``None``, sobald der Feed geschlossen ist."""
+        while not self.outbox.messages:
+            if self.closed:
+                return None
+            self.outbox.ready.clear()
+            await self.outbox.ready.wait()
+        batch = list(self.outbox.messages)
+        self.outbox.messages.clear()
+        return batch
+
+    def close(self):
+        self.closed = True
+        self.outbox.ready.set()
+
+
+class AuctionListener:
+    """Ein Abonnement beim Broker für eine Auktion, verteilt an die Feeds der Sitzungen."""
+
+    def __init__(self, ida: int):
+        self.ida = ida
+        self.feeds: Dict[str, Feed] = {}
+        self.subscribed = False
+        self.task = asyncio.create_task(self.run())
+
+    def forward(self, batch: List[str]):
+        for feed in list(self.feeds.values()):
+            for message in batch:
+                feed.outbox.put(message)
+
+    def on_subscribe(self):
+        # Nach einem Neuaufbau holen die Sitzungen verpasste Ereignisse aus dem Protokoll nach
+        if self.subscribed:
+            self.forward([f"{topic_for(self.ida)}#{events.encode(events.RESUME)}"])
+        self.subscribed = True
+
+    async def run(self):
+        while True:
+            try:
+                async for batch in listen(topic_for(self.ida), on_subscribe=self.on_subscribe):
+                    self.forward(batch)
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+class ListenerRegistry:
+    """Hält je Worker und Auktion ein ``AuctionListener`` für alle Sitzungen.
+
+    Sitzungen werden über ihr Client-Token geführt; meldet sich dasselbe Token
+    erneut an (Neuladen der Seite), wird der alte Feed geschlossen. Verlässt die
+    letzte Sitzung eine Auktion, wird deren Abonnement beendet. ``is_alive``
+    prüft, ob ein Token noch verbunden ist (siehe CrowdBid.py).
+    """
+
+    def __init__(self, sweep_interval: float = SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self.auctions: Dict[int, AuctionListener] = {}
+        self.is_alive: Callable[[str], bool] = lambda token: True
+        self.sweeper: Optional[asyncio.Task] = None
+
+    def join(self, ida: int, token: str) -> Feed:
+        listener = self.auctions.get(ida)
+        if listener is None:
+            listener = self.auctions[ida] = AuctionListener(ida)
+        previous = listener.feeds.get(token)
+        if previous is not None:
+            previous.close()
+        feed = listener.feeds[token] = Feed()
+        if self.sweeper is None or self.sweeper.done():
+            self.sweeper = asyncio.create_task(self.sweep())
+        return feed
+
+    def leave(self, ida: int, token: str, feed: Feed):
+        feed.close()
+        listener = self.auctions.get(ida)
+        if listener is None:
+            return
+        if listener.feeds.get(token) is feed:
+            del listener.feeds[token]
+        if not listener.feeds:
+            listener.task.cancel()
+            del self.auctions[ida]
+
+    async def sweep(self):
+        """Schließt die Feeds getrennter Sitzungen, solange es Auktionen gibt."""
+        while self.auctions:
+            await asyncio.sleep(self.sweep_interval)
+            for ida, listener in list(self.auctions.items()):
+                for token, feed in list(listener.feeds.items()):
+                    if self.is_alive(token):
+                        feed.missed = 0
+                    else:
+                        feed.missed += 1
+                        if feed.missed >= 2:
+                            self.leave(ida, token, feed)
+
+    def counts(self) -> dict:
+        return {"auctions": len(self.auctions), "sessions": sum(len(l.feeds) for l in self.auctions.values())}
+
+
+registry = ListenerRegistry()
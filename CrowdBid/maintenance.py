@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from CrowdBid import db, event_log, summary
+from CrowdBid.cache import auction_cache, count_cache, pivot_cache
+from CrowdBid.models import Auction, AuctionEvent, AuctionSnapshot, Bid, ImportRow
+
+# Auktionen je Transaktion; kleine Blöcke halten die Schreibsperre nur kurz
+BATCH_SIZE = int(os.environ.get("CROWDBID_MAINTENANCE_BATCH_SIZE", "100"))
+# Sekunden zwischen zwei Aufräumläufen, 0 schaltet den Hintergrundlauf ab
+INTERVAL = float(os.environ.get("CROWDBID_MAINTENANCE_INTERVAL", "3600"))
+# Tage, die das Ereignisprotokoll zurückreicht; ältere Ereignisse sind nur noch
+# im Stand der Gebote zur jeweiligen Version enthalten
+EVENT_RETENTION_DAYS = float(os.environ.get("CROWDBID_EVENT_RETENTION_DAYS", "30"))
+
+
+def delete_auctions(ids: Iterable[int]) -> Tuple[int, int]:
+    """Löscht Auktionen samt Geboten, Ereignissen und Zusammenfassungen in einer Transaktion.
+
+    Verwirft danach die Zwischenspeicher; SQLite vergibt die freie ``id`` neu,
+    die nächste Auktion darf nichts davon übernehmen. Liefert die Anzahl
+    gelöschter Auktionen und Gebote.
+    """
+    ids = list(ids)
+    with db.session() as session:
+        bids = session.exec(delete(Bid).where(Bid.ida.in_(ids))).rowcount
+        session.exec(delete(AuctionEvent).where(AuctionEvent.ida.in_(ids)))
+        session.exec(delete(AuctionSnapshot).where(AuctionSnapshot.ida.in_(ids)))
+        # Reste abgebrochener Uploads (siehe csv_import.StagedImport)
+        session.exec(delete(ImportRow).where(ImportRow.ida.in_(ids)))
+        summary.delete_for(session, ids)
+        auctions = session.exec(delete(Auction).where(Auction.id.in_(ids))).rowcount
+        session.commit()
+    for ida in ids:
+        pivot_cache.invalidate(ida)
+        auction_cache.invalidate(ida)
+    count_cache.clear()
+    return auctions, bids
+
+
+def purge_expired(now: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> List[dict]:
+    """Entfernt abgelaufene Auktionen und deren Gebote blockweise.
+
+    Je Block gibt es eine kurze Transaktion mit mengenbasierten DELETEs.
+    Liefert je Block die Anzahl gelöschter Auktionen und Gebote sowie die Dauer.
+    """
+    now = now or datetime.now()
+    batches = []
+    while True:
+        start = time.perf_counter()
+        with db.session() as session:
+            ids = session.exec(select(Auction.id).where(Auction.expiration < now).limit(batch_size)).all()
+        if not ids:
+            break
+        auctions, bids = delete_auctions(ids)
+        batches.append({"auctions": auctions, "bids": bids, "seconds": round(time.perf_counter() - start, 4)})
+    return batches
+
+
+def compact_events(now: Optional[datetime] = None, retention_days: float = EVENT_RETENTION_DAYS,
+                   batch_size: int = BATCH_SIZE) -> List[dict]:
+    """Kompaktiert das Ereignisprotokoll: Ereignisse älter als ``retention_days`` gehen in einen Snapshot.
+
+    Je Auktion schreibt ``event_log.fold`` einen ``AuctionSnapshot`` mit dem
+    Stand zur aktuellen Version und den entfernten Ereignissen. Wer Ereignisse
+    vor dem ältesten erhaltenen bräuchte, lädt neu (siehe ``event_log.since``).
+    Blockweise je ``batch_size`` Auktionen, Rückgabe wie bei ``purge_expired``.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    batches = []
+    while True:
+        start = time.perf_counter()
+        with db.session() as session:
+            db.begin_write(session)
+            ids = session.exec(
+                select(AuctionEvent.ida).where(AuctionEvent.time < cutoff).distinct().limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            folded = sum(event_log.fold(session, ida, cutoff) for ida in ids)
+            session.commit()
+        batches.append({"auctions": len(ids), "events": folded, "seconds": round(time.perf_counter() - start, 4)})
+    return batches
+
+
+async def maintenance_task():
+    """Lifespan-Task: räumt regelmäßig auf, damit niemand /maintenance aufrufen muss."""
+    if INTERVAL <= 0:
+        return
+    while True:
+        try:
+            batches = await asyncio.to_thread(purge_expired)
+            if batches:
+                print(f"Wartung: {sum(b['auctions'] for b in batches)} Auktionen und "
+                      f"{sum(b['bids'] for b in batches)} Gebote in {len(batches)} Blöcken entfernt")
+            compacted = await asyncio.to_thread(compact_events)
+            if compacted:
+                print(f"Wartung: {sum(b['events'] for b in compacted)} Ereignisse in Snapshots zusammengefasst")
+        except Exception as e:
+            print(f"Error: {str(e)}")
+        await asyncio.sleep(INTERVAL)
@@ -0,0 +1,251 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Sequence, Tuple
+
+# Mit CROWDBID_METRICS=1 werden Zähler und Zeiten erfasst und unter /metrics
+# ausgegeben. Ohne bleiben die Handler unverändert (``timed`` gibt die Funktion
+# selbst zurück) und jede Erfassung endet in der ersten Zeile.
+ENABLED = os.environ.get("CROWDBID_METRICS", "") not in ("", "0")
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_registry: List["Metric"] = []
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format(name: str, labels: Labels, value) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{v}"' for k, v in labels)
+        return f"{name}{{{inner}}} {value}"
+    return f"{name} {value}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = _labels(labels) if labels else ()
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            return [_format(self.name, key, value) for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+    def set(self, value: float, **labels):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.values[_labels(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = TIME_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        # je Labelsatz: Zähler je Bucket, Summe, Anzahl
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = _labels(labels) if labels else ()
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            # Nur den passenden Bucket zählen, kumuliert wird erst bei der Ausgabe
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Kontextmanager, der die Dauer des Blocks in Sekunden erfasst."""
+        if not ENABLED:
+            return _NO_TIMER
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(_format(f"{self.name}_bucket", key + (("le", str(bound)),), cumulative))
+                lines.append(_format(f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                lines.append(_format(f"{self.name}_sum", key, total))
+                lines.append(_format(f"{self.name}_count", key, count))
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+_NO_TIMER = nullcontext()
+
+
+HANDLER_SECONDS = Histogram("crowdbid_handler_seconds", "Dauer der Event-Handler und Exporte")
+HANDLER_ERRORS = Counter("crowdbid_handler_errors_total", "Ausnahmen in Event-Handlern und Exporten")
+DB_SESSIONS = Counter("crowdbid_db_sessions_total", "Geöffnete Datenbank-Sitzungen")
+DB_COMMIT_SECONDS = Histogram("crowdbid_db_commit_seconds", "Dauer der Commits")
+DB_ROLLBACKS = Counter("crowdbid_db_rollbacks_total", "Zurückgerollte Transaktionen")
+DB_QUERY_SECONDS = Histogram("crowdbid_db_query_seconds", "Dauer der SQL-Anweisungen")
+RELAY_FANOUT = Histogram("crowdbid_relay_fanout", "Empfänger je veröffentlichter Nachricht", SIZE_BUCKETS)
+RELAY_SEND_SECONDS = Histogram("crowdbid_relay_send_seconds", "Dauer einer Sendung an einen Empfänger")
+RELAY_DROPPED = Counter("crowdbid_relay_dropped_clients_total", "Getrennte Empfänger (geschlossen oder zu langsam)")
+RELAY_DROPPED_MESSAGES = Counter("crowdbid_relay_dropped_messages_total", "Bei Überlauf durch RELOAD ersetzte Nachrichten")
+RELAY_CLIENTS = Gauge("crowdbid_relay_connected_clients", "Verbundene WebSocket-Clients am Relay")
+AUCTION_CACHE_HITS = Counter("crowdbid_auction_cache_hits_total", "Auktion per Token aus dem Zwischenspeicher")
+AUCTION_CACHE_MISSES = Counter("crowdbid_auction_cache_misses_total", "Auktion per Token aus der Datenbank gelesen")
+
+
+def timed(name: str):
+    """Erfasst Dauer und Ausnahmen einer Funktion unter ``handler=name``.
+
+    Funktioniert für normale Funktionen, Coroutinen und (asynchrone) Generatoren,
+    damit Reflex die Art des Event-Handlers weiterhin erkennt. Bei Generatoren
+    zählt die Zeit bis zum letzten Element. Ohne CROWDBID_METRICS bleibt die
+    Funktion unverändert.
+    """
+
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with _measure(name):
+                    async for item in fn(*args, **kwargs):
+                        yield item
+        elif inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with _measure(name):
+                    return await fn(*args, **kwargs)
+        elif inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _measure(name):
+                    yield from fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _measure(name):
+                    return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def _measure(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        HANDLER_ERRORS.inc(handler=name)
+        raise
+    finally:
+        HANDLER_SECONDS.observe(time.perf_counter() - start, handler=name)
+
+
+_sessions_instrumented = False
+
+
+def instrument_db(engine, session_cls):
+    """Hängt Zeitmessungen für SQL-Anweisungen und Commits an Engine und Session-Klasse."""
+    global _sessions_instrumented
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("crowdbid_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("crowdbid_query_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop())
+
+    if _sessions_instrumented:
+        return
+    _sessions_instrumented = True
+
+    @event.listens_for(session_cls, "before_commit")
+    def before_commit(session):
+        session.info["crowdbid_commit_start"] = time.perf_counter()
+
+    @event.listens_for(session_cls, "after_commit")
+    def after_commit(session):
+        start = session.info.pop("crowdbid_commit_start", None)
+        if start is not None:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+    @event.listens_for(session_cls, "after_soft_rollback")
+    def after_rollback(session, previous_transaction):
+        DB_ROLLBACKS.inc()
+
+
+def render() -> str:
+    """Alle Metriken im Textformat von Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
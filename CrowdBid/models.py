@@ -1,26 +1,90 @@
 from datetime import datetime, timedelta
 import reflex as rx
+import sqlalchemy
 import sqlmodel
 
 
 class Auction(rx.Model, table=True):
+    # Keyset-Blättern in der Auktionsliste
+    __table_args__ = (sqlalchemy.Index("ix_auction_update_at_id", "update_at", "id"),)
+
     id: int = sqlmodel.Field(default=None, primary_key=True)
     token: str = sqlmodel.Field(max_length=16, unique=True)
     config_token: str = sqlmodel.Field(max_length=16, unique=True)
     create_at: datetime
     update_at: datetime
-    expiration: datetime = sqlmodel.Field(default=None)
+    expiration: datetime = sqlmodel.Field(default=None, index=True)  # /maintenance
     topic: str = sqlmodel.Field(default=None)
     description: str = sqlmodel.Field(default=None)
     round_end_mode: str = sqlmodel.Field(default="auto")
     peek: bool = sqlmodel.Field(default=True)
     target_bid: float = sqlmodel.Field(default=None)
     last_round: int = sqlmodel.Field(default=-1)
+    # Wird von jeder Änderung an den Geboten zuerst erhöht (siehe writes.bump_version)
+    version: int = sqlmodel.Field(default=0, sa_column_kwargs={"server_default": "0"})
 
 
 class Bid(rx.Model, table=True):
+    # Der Primärschlüssel (ida, name, round) deckt "ida = ?" und "ida = ? AND name = ?" ab
+    __table_args__ = (sqlalchemy.Index("ix_bid_ida_round", "ida", "round"),)
+
     ida: int = sqlmodel.Field(default=None, primary_key=True)
     name: str = sqlmodel.Field(default=None, primary_key=True)
     round: int = sqlmodel.Field(default=None, primary_key=True)
     bid: float
-    time: datetime
\ No newline at end of file
+    time: datetime
+
+
+class BrokerMessage(rx.Model, table=True):
+    # Nachrichten des Brokers "sqlite" (siehe broker.py); werden nach kurzer Zeit gelöscht
+    id: int = sqlmodel.Field(default=None, primary_key=True)
+    topic: str = sqlmodel.Field(index=True)
+    message: str
+    time: datetime = sqlmodel.Field(index=True)
+
+
+class AuctionEvent(rx.Model, table=True):
+    # Protokoll aller Änderungen einer Auktion; ``seq`` ist die dabei vergebene
+    # ``Auction.version`` (siehe event_log.py), der Primärschlüssel deckt "seit seq" ab
+    ida: int = sqlmodel.Field(default=None, primary_key=True)
+    seq: int = sqlmodel.Field(default=None, primary_key=True)
+    kind: str
+    payload: str  # das veröffentlichte Ereignis (events.encode)
+    time: datetime = sqlmodel.Field(index=True)
+
+
+class AuctionSnapshot(rx.Model, table=True):
+    # Beim Kompaktieren des Protokolls (siehe maintenance.compact_events): der Stand
+    # der Auktion zur Version ``seq`` und die dabei entfernten Ereignisse
+    ida: int = sqlmodel.Field(default=None, primary_key=True)
+    seq: int = sqlmodel.Field(default=None, primary_key=True)
+    state: str  # JSON: last_round und die Gebote als [Name, Runde, Gebot]
+    events: str  # JSON: die entfernten Ereignisse (events.encode) in Reihenfolge
+    time: datetime
+
+
+class ImportRow(rx.Model, table=True):
+    # Zwischenablage eines laufenden CSV-Uploads (siehe csv_import.StagedImport);
+    # ``upload`` trennt gleichzeitige Uploads, übernommen wird erst am Ende
+    upload: str = sqlmodel.Field(default=None, primary_key=True)
+    name: str = sqlmodel.Field(default=None, primary_key=True)
+    round: int = sqlmodel.Field(default=None, primary_key=True)
+    ida: int = sqlmodel.Field(index=True)
+    bid: float
+
+
+class RoundSummary(rx.Model, table=True):
+    # Je Runde mit Geboten: Summe inkl. übernommener Gebote und Zahl der echten
+    # Gebote; gepflegt von den Schreibzugriffen (siehe summary.py)
+    ida: int = sqlmodel.Field(default=None, primary_key=True)
+    round: int = sqlmodel.Field(default=None, primary_key=True)
+    total: float = 0.0
+    bidder_count: int = 0
+
+
+class LatestBid(rx.Model, table=True):
+    # Je Bietendem die höchste Runde mit Gebot (0 = nur angelegt) und dieses Gebot
+    ida: int = sqlmodel.Field(default=None, primary_key=True)
+    name: str = sqlmodel.Field(default=None, primary_key=True)
+    round: int
+    bid: float
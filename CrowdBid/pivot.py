@@ -0,0 +1,244 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from CrowdBid import events
+
+NAN = float("nan")
+
+
+def derive_round(ar: int, last_round: int, round_end_mode: str, bidders: int, with_ar: int) -> Tuple[int, int]:
+    """Aktuelle Runde und Zahl der fehlenden Gebote.
+
+    ``ar`` ist die höchste Runde mit Geboten, ``with_ar`` die Zahl der Bietenden,
+    für die in dieser Runde ein (ggf. übernommener) Wert angezeigt wird.
+    """
+    missing = bidders - with_ar
+    if ar == 0 or (missing == 0 and round_end_mode == "auto") or last_round > ar:
+        return ar + 1, bidders
+    return ar, missing
+
+
+def status_text(target_bid: float, actual_round: int, sums: List[float]) -> str:
+    """Statuszeile der Gebotsseite; ``sums[r - 1]`` ist die Summe der Runde ``r``."""
+    if actual_round < 2:
+        return f"Es sind {target_bid} € aufzubringen. Durch Klicken auf das ＋ können neue Bietende hinzugefügt werden."
+    s = sums[actual_round - 2] if actual_round - 2 < len(sums) else 0
+    if target_bid > s:
+        return f"Es sind {target_bid} € aufzubringen. In der Letzten Runde wurden davon {s / target_bid * 100:.1f} % erreicht. Es Fehlen noch {target_bid - s} €"
+    return f"Es waren {target_bid} € aufzubringen. Es sind zusätzlich {s - target_bid} € geboten worden"
+
+
+class BidPivot:
+    """Gebotstabelle einer Auktion, spaltenweise gespeichert.
+
+    Je Runde gibt es ein ``array('d')`` mit einem Wert je Bietendem (Reihenfolge
+    wie ``names``). Eine Zelle enthält das bis zu dieser Runde gültige Gebot,
+    NaN heißt: noch kein Gebot. ``carried`` markiert Zellen, deren Wert aus einer
+    früheren Runde übernommen wurde; angezeigt werden diese negativ.
+    Ereignisse (siehe ``CrowdBid.events``) werden direkt in die Spalten
+    eingearbeitet, ohne die Gebote erneut aus der Datenbank zu laden. ``seq``
+    ist die Version der Auktion, bis zu der die Tabelle reicht (falls bekannt).
+    """
+
+    def __init__(self, names: Iterable[str], last_round: int, round_end_mode: str, target_bid: float):
+        self.names: List[str] = list(names)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.columns: List[array] = []
+        self.carried: List[bytearray] = []
+        self.col_sums: List[float] = []
+        self.bid_counts: List[int] = []  # echte Gebote je Runde
+        self.value_counts: List[int] = []  # Zellen mit Wert (echt oder übernommen) je Runde
+        self.dirty: Set[int] = set()  # Spalten, deren Summe neu berechnet werden muss
+        self.last_round = last_round
+        self.round_end_mode = round_end_mode
+        self.target_bid = target_bid
+        self.shared = False
+        self.seq: Optional[int] = None
+        self.finish()
+
+    @classmethod
+    def from_values(cls, values: Dict[str, Dict[int, float]], last_round: int, round_end_mode: str,
+                    target_bid: float) -> "BidPivot":
+        pivot = cls(values.keys(), last_round, round_end_mode, target_bid)
+        ar = max((r for bids in values.values() for r in bids), default=0)
+        n = len(pivot.names)
+        pivot.columns = [array('d', [NAN]) * n for _ in range(ar)]
+        pivot.carried = [bytearray(n) for _ in range(ar)]
+        for i, bids in enumerate(values.values()):
+            tv = NAN
+            for r in range(1, ar + 1):
+                if r in bids:
+                    tv = bids[r]
+                elif not math.isnan(tv):
+                    pivot.carried[r - 1][i] = 1
+                pivot.columns[r - 1][i] = tv
+        for col, carried in zip(pivot.columns, pivot.carried):
+            count = sum(1 for v in col if not math.isnan(v))
+            pivot.value_counts.append(count)
+            pivot.bid_counts.append(count - sum(carried))
+            pivot.col_sums.append(0.0)
+        pivot.dirty = set(range(ar))
+        pivot.finish()
+        return pivot
+
+    @classmethod
+    def from_bids(cls, auction, bids) -> "BidPivot":
+        values = {}
+        for bid in bids:
+            values.setdefault(bid.name, {})[bid.round] = bid.bid
+        return cls.from_values(values, auction.last_round, auction.round_end_mode, auction.target_bid)
+
+    def copy(self) -> "BidPivot":
+        """Eigene, veränderbare Kopie (z.B. eines geteilten Stands aus dem Cache)."""
+        pivot = BidPivot.__new__(BidPivot)
+        pivot.__dict__.update(self.__dict__)
+        pivot.shared = False
+        pivot.names = list(self.names)
+        pivot.index = dict(self.index)
+        pivot.columns = [array('d', col) for col in self.columns]
+        pivot.carried = [bytearray(carried) for carried in self.carried]
+        pivot.col_sums = list(self.col_sums)
+        pivot.bid_counts = list(self.bid_counts)
+        pivot.value_counts = list(self.value_counts)
+        pivot.dirty = set(self.dirty)
+        pivot.rounds = list(self.rounds)
+        pivot.sums = list(self.sums)
+        return pivot
+
+    @property
+    def ar(self) -> int:
+        """Höchste Runde, in der geboten wurde."""
+        return len(self.columns)
+
+    def finish(self):
+        """Leitet Summen, aktuelle Runde, fehlende Gebote und Status ab."""
+        for k in self.dirty:
+            # Reduktion über die Spalte; NaN (noch kein Gebot) zählt nicht mit
+            self.col_sums[k] = math.fsum(v for v in self.columns[k] if not math.isnan(v))
+        self.dirty.clear()
+
+        ar = self.ar
+        with_ar = 0
+        if ar:
+            # Übernommene Werte stehen nur in der Zeile, solange die Runde beendet ist
+            with_ar = self.value_counts[ar - 1] if self.last_round > ar else self.bid_counts[ar - 1]
+        self.actual_round, self.missing = derive_round(ar, self.last_round, self.round_end_mode, len(self.names), with_ar)
+        self.status = status_text(self.target_bid, self.actual_round, self.col_sums)
+        self.rounds = list(range(1, self.actual_round))
+        self.sums = self.col_sums[:self.actual_round - 1]
+
+    def cell(self, i: int, r: int) -> Optional[float]:
+        """Anzeigewert einer Zelle: Gebot, negativ wenn übernommen, ``None`` wenn leer."""
+        if r < 1 or r > self.ar:
+            return None
+        v = self.columns[r - 1][i]
+        if math.isnan(v):
+            return None
+        if self.carried[r - 1][i]:
+            return -v if r < max(self.ar, self.last_round) else None
+        return v
+
+    def encode(self, rows: slice, rounds: List[int]) -> Tuple[List[str], List[List[Optional[float]]], List[bool]]:
+        """Kompakte Form für den Browser: Namen, je Zeile die Zellen von ``rounds``
+        und ob in der aktuellen Runde schon ein Wert steht."""
+        indices = range(len(self.names))[rows]
+        names = [self.names[i] for i in indices]
+        cells = [[self.cell(i, r) for r in rounds] for i in indices]
+        current = [self.cell(i, self.actual_round) is not None for i in indices]
+        return names, cells, current
+
+    def apply(self, event: dict) -> bool:
+        """Arbeitet ein Ereignis ein. ``False`` heißt: nachholen oder aus der Datenbank neu laden.
+
+        Ereignisse mit ``seq`` werden nur in lückenloser Folge eingearbeitet;
+        bereits enthaltene werden übersprungen.
+        """
+        seq = event.get("seq")
+        if seq is not None and self.seq is not None:
+            if seq <= self.seq:
+                return True
+            if seq != self.seq + 1:
+                return False
+        if not self._apply(event):
+            return False
+        if seq is not None:
+            self.seq = seq
+        return True
+
+    def _apply(self, event: dict) -> bool:
+        kind = event.get("kind")
+        if kind == events.BID:
+            return self.set_bid(event["name"], int(event["round"]), float(event["bid"]))
+        if kind == events.ADD:
+            return self.add_bidder(event["name"])
+        if kind == events.RENAME:
+            return self.rename(event["old"], event["new"])
+        if kind == events.ROUND_END:
+            self.last_round = int(event["last_round"])
+            self.finish()
+            return True
+        return False
+
+    def _append_column(self):
+        """Neue Runde: alle bisherigen Werte werden übernommen."""
+        if self.columns:
+            last = self.columns[-1]
+            self.columns.append(array('d', last))
+            self.carried.append(bytearray(0 if math.isnan(v) else 1 for v in last))
+            self.value_counts.append(self.value_counts[-1])
+            self.col_sums.append(self.col_sums[-1])
+        else:
+            self.columns.append(array('d', [NAN]) * len(self.names))
+            self.carried.append(bytearray(len(self.names)))
+            self.value_counts.append(0)
+            self.col_sums.append(0.0)
+        self.bid_counts.append(0)
+
+    def set_bid(self, name: str, round: int, bid: float) -> bool:
+        if name not in self.index:
+            return False
+        if round < 1:
+            return True
+        while self.ar < round:
+            self._append_column()
+        i = self.index[name]
+        k = round - 1
+        if math.isnan(self.columns[k][i]):
+            self.value_counts[k] += 1
+            self.bid_counts[k] += 1
+        elif self.carried[k][i]:
+            self.bid_counts[k] += 1
+        self.columns[k][i] = bid
+        self.carried[k][i] = 0
+        self.dirty.add(k)
+        # Das Gebot gilt in den folgenden Runden weiter, bis dort selbst geboten wurde
+        for k in range(round, self.ar):
+            v = self.columns[k][i]
+            if not math.isnan(v) and not self.carried[k][i]:
+                break
+            if math.isnan(v):
+                self.value_counts[k] += 1
+            self.columns[k][i] = bid
+            self.carried[k][i] = 1
+            self.dirty.add(k)
+        self.finish()
+        return True
+
+    def add_bidder(self, name: str) -> bool:
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            for col, carried in zip(self.columns, self.carried):
+                col.append(NAN)
+                carried.append(0)
+            self.finish()
+        return True
+
+    def rename(self, old: str, new: str) -> bool:
+        if old not in self.index or new in self.index:
+            return False
+        i = self.index.pop(old)
+        self.index[new] = i
+        self.names[i] = new
+        return True
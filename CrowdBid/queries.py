@@ -0,0 +1,55 @@
+from typing import List
+
+from sqlmodel import func, select
+
+from CrowdBid.models import Auction, LatestBid, RoundSummary
+from CrowdBid.pivot import derive_round, status_text
+
+
+class RoundStatus:
+    """Rundenstand einer Auktion, gelesen aus den Zusammenfassungen statt aus den Geboten."""
+
+    def __init__(self, auction_id: int, ar: int, last_round: int, round_end_mode: str, target_bid: float,
+                 bidders: int, with_ar: int, sums: List[float]):
+        self.auction_id = auction_id
+        self.ar = ar
+        self.last_round = last_round
+        self.bidders = bidders
+        self.sums = sums
+        self.actual_round, self.missing = derive_round(ar, last_round, round_end_mode, bidders, with_ar)
+        self.status = status_text(target_bid, self.actual_round, sums)
+
+
+def round_status(session, ida: int, with_sums: bool = True) -> RoundStatus:
+    """Liest den aktuellen Rundenstand einer Auktion aus den Zusammenfassungen (siehe summary.py).
+
+    Der Aufwand wächst mit der Zahl der Runden, nicht der Gebote. Ohne
+    ``with_sums`` bleiben die Rundensummen (und damit die Statuszeile) leer und
+    es wird nur die letzte Runde gelesen, alles in einer Abfrage.
+    """
+    latest = select(func.count()).where(LatestBid.ida == ida)
+    columns = [Auction.last_round, Auction.round_end_mode, Auction.target_bid, latest.scalar_subquery(),
+               latest.where(LatestBid.round >= 1).scalar_subquery()]
+    rows = select(RoundSummary.round, RoundSummary.total, RoundSummary.bidder_count).where(RoundSummary.ida == ida)
+    if not with_sums:
+        # Letzte Runde in derselben Abfrage
+        last = rows.order_by(RoundSummary.round.desc()).limit(1)
+        columns += [last.with_only_columns(RoundSummary.round).scalar_subquery(),
+                    last.with_only_columns(RoundSummary.bidder_count).scalar_subquery()]
+    last_round, round_end_mode, target_bid, bidders, with_value, *last_row = session.exec(
+        select(*columns).where(Auction.id == ida)
+    ).one()
+    if with_sums:
+        rows = session.exec(rows.order_by(RoundSummary.round)).all()
+        ar, at_ar = (rows[-1][0], rows[-1][2]) if rows else (0, 0)
+    else:
+        ar, at_ar = (last_row[0] or 0, last_row[1] or 0)
+    # Übernommene Werte zählen nur, solange die höchste Runde beendet ist
+    with_ar = 0 if ar < 1 else with_value if last_round > ar else at_ar
+    sums = []
+    if with_sums:
+        totals = {r: total for r, total, _ in rows}
+        for r in range(1, ar + 1):
+            # Runden ohne Gebote haben keine Zeile, es gilt die Summe davor
+            sums.append(float(totals.get(r, sums[-1] if sums else 0.0)))
+    return RoundStatus(ida, ar, last_round, round_end_mode, target_bid, bidders, with_ar, sums)
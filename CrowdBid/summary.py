@@ -0,0 +1,177 @@
+import asyncio
+import math
+from typing import Iterable, List
+
+from sqlalchemy import delete, insert, literal, update
+from sqlmodel import func, select
+
+from CrowdBid import db
+from CrowdBid.models import Bid, LatestBid, RoundSummary
+
+
+# Die Zusammenfassungen (``RoundSummary``, ``LatestBid``) gehören zur Transaktion
+# des jeweiligen Schreibzugriffs; das Commit bleibt beim Aufrufer.
+
+def apply_bid(session, ida: int, name: str, round: int, bid: float):
+    """Arbeitet ein Gebot ein; aufzurufen, bevor es geschrieben wird.
+
+    Das Gebot gilt ab ``round`` bis vor die nächste eigene Runde des Bietenden
+    (Übernahme). Die Summen genau dieser Runden ändern sich um die Differenz
+    zum bisher dort geltenden Wert. Gelesen werden nur das vorige und das
+    nächste eigene Gebot, nicht die ganze Reihe.
+    """
+    if round < 1:
+        return
+    own = (Bid.ida == ida) & (Bid.name == name)
+    previous = (select(Bid.round, Bid.bid).where(own & (Bid.round >= 1) & (Bid.round <= round))
+                .order_by(Bid.round.desc()).limit(1).subquery())
+    previous_round, previous_bid, later, last_summary = session.exec(select(
+        select(previous.c.round).scalar_subquery(),
+        select(previous.c.bid).scalar_subquery(),
+        select(func.min(Bid.round)).where(own & (Bid.round > round)).scalar_subquery(),
+        select(func.max(RoundSummary.round)).where(RoundSummary.ida == ida).scalar_subquery(),
+    )).one()
+    delta = bid - (previous_bid or 0.0)
+    counted = RoundSummary.bidder_count + (0 if previous_round == round else 1)
+
+    # Zeile der Runde anlegen oder ändern; eine neue übernimmt die Summe der Runde davor
+    carried = (select(RoundSummary.total).where((RoundSummary.ida == ida) & (RoundSummary.round < round))
+               .order_by(RoundSummary.round.desc()).limit(1).scalar_subquery())
+    row = {"ida": ida, "round": round, "total": func.coalesce(carried, 0.0) + delta, "bidder_count": 1}
+    changed = {"total": RoundSummary.total + delta, "bidder_count": counted}
+    make_insert = db.UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is not None:
+        session.exec(make_insert(RoundSummary).values(**row).on_conflict_do_update(
+            index_elements=[RoundSummary.ida, RoundSummary.round], set_=changed))
+    elif not session.exec(update(RoundSummary).where((RoundSummary.ida == ida) & (RoundSummary.round == round))
+                          .values(**changed)).rowcount:
+        session.exec(insert(RoundSummary).values(**row))
+
+    # Spätere Runden ohne eigenes Gebot übernehmen den neuen Wert (entfällt für die letzte Runde)
+    if (last_summary or 0) > round and (later is None or later > round + 1):
+        affected = (RoundSummary.ida == ida) & (RoundSummary.round > round)
+        if later is not None:
+            affected &= RoundSummary.round < later
+        session.exec(update(RoundSummary).where(affected).values(total=RoundSummary.total + delta))
+
+    if later is None:
+        if make_insert is not None:
+            stmt = make_insert(LatestBid).values(ida=ida, name=name, round=round, bid=bid)
+            session.exec(stmt.on_conflict_do_update(
+                index_elements=[LatestBid.ida, LatestBid.name],
+                set_={"round": stmt.excluded.round, "bid": stmt.excluded.bid}))
+        elif not session.exec(update(LatestBid).where((LatestBid.ida == ida) & (LatestBid.name == name))
+                              .values(round=round, bid=bid)).rowcount:
+            session.add(LatestBid(ida=ida, name=name, round=round, bid=bid))
+
+
+def add_bidder(session, ida: int, name: str):
+    """Neuer Bietender (Eintrag für Runde 0)."""
+    if session.exec(select(LatestBid.round).where((LatestBid.ida == ida) & (LatestBid.name == name))).first() is None:
+        session.add(LatestBid(ida=ida, name=name, round=0, bid=0))
+
+
+def rename(session, ida: int, old: str, new: str):
+    session.exec(update(LatestBid).where((LatestBid.ida == ida) & (LatestBid.name == old)).values(name=new))
+
+
+def summary_rows(ida: int):
+    """Die Zeilen von ``RoundSummary``, berechnet aus den Geboten (ohne sie zu laden).
+
+    Je Bietendem wird die Änderung gegenüber seinem vorigen Gebot gebildet (LAG);
+    die fortlaufende Summe dieser Änderungen über die Runden ergibt die Rundensumme.
+    """
+    deltas = select(
+        Bid.round.label("round"),
+        (Bid.bid - func.coalesce(func.lag(Bid.bid).over(partition_by=Bid.name, order_by=Bid.round), 0)).label("delta"),
+    ).where(Bid.ida == ida, Bid.round >= 1).subquery()
+    per_round = select(
+        deltas.c.round, func.sum(deltas.c.delta).label("delta"), func.count().label("bidder_count")
+    ).group_by(deltas.c.round).subquery()
+    return select(
+        literal(ida).label("ida"),
+        per_round.c.round,
+        func.sum(per_round.c.delta).over(order_by=per_round.c.round).label("total"),
+        per_round.c.bidder_count,
+    )
+
+
+def latest_rows(ida: int):
+    """Die Zeilen von ``LatestBid``: je Bietendem das Gebot seiner höchsten Runde."""
+    last = select(Bid.name, func.max(Bid.round).label("max_round")).where(Bid.ida == ida).group_by(Bid.name).subquery()
+    return (select(Bid.ida, Bid.name, Bid.round, Bid.bid)
+            .join(last, (Bid.name == last.c.name) & (Bid.round == last.c.max_round))
+            .where(Bid.ida == ida))
+
+
+def delete_for(session, ids: Iterable[int]):
+    ids = list(ids)
+    session.exec(delete(RoundSummary).where(RoundSummary.ida.in_(ids)))
+    session.exec(delete(LatestBid).where(LatestBid.ida.in_(ids)))
+
+
+def rebuild(session, ida: int):
+    """Baut beide Zusammenfassungen einer Auktion neu auf (Import, Änderungen auf der Datenseite).
+
+    Per ``INSERT ... SELECT`` in der Datenbank; der Speicherbedarf hängt nicht
+    von der Zahl der Gebote ab.
+    """
+    session.flush()
+    delete_for(session, [ida])
+    session.exec(insert(RoundSummary).from_select(["ida", "round", "total", "bidder_count"], summary_rows(ida)))
+    session.exec(insert(LatestBid).from_select(["ida", "name", "round", "bid"], latest_rows(ida)))
+
+
+def verify(session, ida: int, repair: bool = False) -> List[str]:
+    """Vergleicht die gespeicherten Zusammenfassungen mit den aus den Geboten berechneten.
+
+    Liefert die Abweichungen; mit ``repair`` werden sie dabei neu aufgebaut.
+    """
+    problems = []
+    stored = {row.round: row for row in session.exec(select(RoundSummary).where(RoundSummary.ida == ida)).all()}
+    for _, r, total, bidder_count in session.exec(summary_rows(ida)):
+        have = stored.pop(r, None)
+        if have is None:
+            problems.append(f"Runde {r}: fehlt")
+        elif have.bidder_count != bidder_count or not math.isclose(have.total, total, abs_tol=1e-6):
+            problems.append(f"Runde {r}: gespeichert {have.total}/{have.bidder_count}, "
+                            f"erwartet {total}/{bidder_count}")
+    problems += [f"Runde {r}: überzählig" for r in stored]
+    stored = {row.name: row for row in session.exec(select(LatestBid).where(LatestBid.ida == ida)).all()}
+    for _, name, r, bid in session.exec(latest_rows(ida)):
+        have = stored.pop(name, None)
+        if have is None:
+            problems.append(f"{name}: fehlt")
+        elif have.round != r or not math.isclose(have.bid, bid, abs_tol=1e-6):
+            problems.append(f"{name}: gespeichert Runde {have.round} ({have.bid}), "
+                            f"erwartet Runde {r} ({bid})")
+    problems += [f"{name}: überzählig" for name in stored]
+    if problems and repair:
+        rebuild(session, ida)
+    return problems
+
+
+def backfill() -> int:
+    """Baut die Zusammenfassungen für Auktionen mit Geboten, aber ohne Zusammenfassung auf.
+
+    Für Datenbanken von vor Einführung der Tabellen; je Auktion eine Transaktion.
+    """
+    with db.session() as session:
+        ids = session.exec(
+            select(Bid.ida).distinct().where(~select(LatestBid.ida).where(LatestBid.ida == Bid.ida).exists())
+        ).all()
+    for ida in ids:
+        with db.session() as session:
+            rebuild(session, ida)
+            session.commit()
+    return len(ids)
+
+
+async def backfill_task():
+    """Lifespan-Task: einmaliges ``backfill`` beim Start."""
+    try:
+        count = await asyncio.to_thread(backfill)
+        if count:
+            print(f"Zusammenfassungen für {count} Auktionen aufgebaut")
+    except Exception as e:
+        print(f"Error: {str(e)}")
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from CrowdBid import db, event_log, events, summary
+from CrowdBid.models import Auction, Bid
+from CrowdBid.queries import round_status
+
+
+class RoundClosed(Exception):
+    """Das Gebot galt einer Runde, die inzwischen nicht mehr die aktuelle ist."""
+
+    def __init__(self, expected: int, actual: int):
+        super().__init__(f"Die Runde {expected} ist bereits beendet, aktuell ist Runde {actual}.")
+        self.expected = expected
+        self.actual = actual
+
+
+def bump_version(session, ida: int) -> int:
+    """Erhöht die Version der Auktion; muss die erste Schreibanweisung der Transaktion sein.
+
+    Damit hält die Transaktion ab hier die Schreibsperre (SQLite) bzw. die
+    Zeilensperre der Auktion, und alles danach Gelesene bleibt bis zum Commit
+    gültig. Läse sie vorher, könnte SQLite die Sperre nicht mehr erweitern und
+    bräche sofort mit "database is locked" ab; deshalb beginnt die Transaktion
+    unter SQLite mit ``BEGIN IMMEDIATE`` (siehe ``db.begin_write``).
+    """
+    db.begin_write(session)
+    stmt = update(Auction).where(Auction.id == ida).values(version=Auction.version + 1)
+    if session.get_bind().dialect.update_returning:
+        return session.exec(stmt.returning(Auction.version)).scalar_one()
+    session.exec(stmt)
+    return session.exec(select(Auction.version).where(Auction.id == ida)).one()
+
+
+def upsert_bid(session, ida: int, name: str, round: int, bid: float):
+    """Schreibt ein Gebot mit einer Anweisung, ein vorhandenes der Runde wird ersetzt.
+
+    Die Zusammenfassungen (siehe summary.py) werden vorher angepasst.
+    """
+    summary.apply_bid(session, ida, name, round, bid)
+    now = datetime.now()
+    make_insert = db.UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is None:
+        session.merge(Bid(ida=ida, name=name, round=round, bid=bid, time=now))
+        return
+    stmt = make_insert(Bid).values(ida=ida, name=name, round=round, bid=bid, time=now)
+    session.exec(stmt.on_conflict_do_update(
+        index_elements=[Bid.ida, Bid.name, Bid.round],
+        set_={"bid": stmt.excluded.bid, "time": stmt.excluded.time},
+    ))
+
+
+def place_bid(session, ida: int, name: str, bid: float, expected_round: int) -> str:
+    """Gibt ein Gebot in der aktuellen Runde ab und liefert das protokollierte Ereignis.
+
+    Ist ``expected_round`` (die Runde, die der Bietende sieht) nicht mehr die
+    aktuelle, wird nichts geschrieben und ``RoundClosed`` ausgelöst. Das Commit
+    bleibt beim Aufrufer.
+    """
+    seq = bump_version(session, ida)
+    actual_round = round_status(session, ida, with_sums=False).actual_round
+    if actual_round != expected_round:
+        session.rollback()
+        raise RoundClosed(expected_round, actual_round)
+    upsert_bid(session, ida, name, actual_round, bid)
+    return event_log.record(session, ida, seq, events.BID, f"{name} hat ein Gebot abgegeben.",
+                            name=name, round=actual_round, bid=bid)
+
+
+def close_round(session, ida: int, expected_round: int) -> Optional[str]:
+    """Beendet die Runde ``expected_round`` (die Runde, die die Seite anzeigt) und liefert das protokollierte Ereignis.
+
+    Ist sie nicht mehr die aktuelle (z.B. doppelter Klick), wird nichts
+    geschrieben und ``RoundClosed`` ausgelöst. Eine Runde ohne Gebote bleibt
+    offen, dann ist das Ergebnis ``None``. Das Commit bleibt beim Aufrufer.
+    """
+    seq = bump_version(session, ida)
+    status = round_status(session, ida, with_sums=False)
+    if status.actual_round != expected_round:
+        session.rollback()
+        raise RoundClosed(expected_round, status.actual_round)
+    if status.ar < expected_round:
+        return None
+    session.exec(update(Auction).where(Auction.id == ida).values(last_round=expected_round + 1))
+    return event_log.record(session, ida, seq, events.ROUND_END, f"Die Runde {expected_round} wurde beendet.",
+                            last_round=expected_round + 1)
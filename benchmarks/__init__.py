@@ -0,0 +1,2 @@
+# reflex muss vor sqlmodel geladen werden (pydantic-Kompatibilität)
+import reflex  # noqa: F401
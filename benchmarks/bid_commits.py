@@ -0,0 +1,78 @@
+"""Lasttest für Gebots-Commits: SQLite-Standardeinstellungen gegen ``CrowdBid.db``.
+
+Viele Threads schreiben gleichzeitig Gebote per ``session.merge`` wie
+``BidState.handle_bid``. Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.bid_commits --bidders 50 --bids 40
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import sqlmodel
+
+from CrowdBid import db
+from CrowdBid.models import Bid
+
+from benchmarks.harness import percentile
+
+
+def run(engine, bidders: int, bids: int) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def bidder(i):
+        for r in range(1, bids + 1):
+            start = time.perf_counter()
+            try:
+                with sqlmodel.Session(engine) as session:
+                    session.merge(Bid(ida=1, name=f"B{i}", round=r, bid=float(r), time=datetime.now()))
+                    session.commit()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    threads = [threading.Thread(target=bidder, args=(i,)) for i in range(bidders)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "commits": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bidders", type=int, default=50)
+    parser.add_argument("--bids", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (
+            ("Standard", lambda url: db.make_engine(url)),
+            ("Abgestimmt", lambda url: db.make_engine(url, db.SQLITE_PRAGMAS, pool_size=db.POOL_SIZE, max_overflow=db.MAX_OVERFLOW)),
+        ):
+            url = f"sqlite:///{os.path.join(tmp, label)}.db"
+            engine = make(url)
+            sqlmodel.SQLModel.metadata.create_all(engine)
+            result = run(engine, args.bidders, args.bids)
+            engine.dispose()
+            print(f"{label:10} {result['commits']:6d} Commits, {result['errors']:4d} Fehler, "
+                  f"{result['throughput']:8.1f} Commits/s, p50 {result['p50_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Gleichzeitige Gebote während Runden beendet werden: ``writes.place_bid`` gegen das alte ``merge``.
+
+Viele Threads bieten auf dieselbe Auktion (Rundenende per Hand), jeweils für
+die Runde, die sie kurz vorher gelesen haben; ein weiterer Thread beendet
+laufend Runden, ebenfalls für die zuvor gelesene Runde. Ein Trigger der
+Testdatenbank merkt sich bei jeder Änderung von ``last_round`` die beendete
+Runde und protokolliert jedes Gebot, das danach in sie geschrieben wird.
+Zusätzlich wird dieselbe Runde zweimal hintereinander beendet (doppelter
+Klick); ``last_round`` darf sich dabei nur einmal ändern. ``upsert`` muss ohne
+solche Gebote, ohne doppeltes Beenden und ohne Fehler auskommen; abgelehnte
+Gebote und Rundenenden sind erwartet. Bei
+``merge`` fehlt die Sperre durch ``bump_version``; Fehler entstehen dort, wenn
+zwei Gebote gleichzeitig die Zeile einer neuen Runde in ``roundsummary`` anlegen.
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.bid_race --bidders 20 --bids 50 --end-every 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy
+import sqlmodel
+from sqlmodel import select
+
+from CrowdBid import db, summary
+from CrowdBid.models import Auction, Bid
+from CrowdBid.queries import round_status
+from CrowdBid.writes import RoundClosed, close_round, place_bid
+
+from benchmarks.harness import summarize
+
+CLOSED_WRITE_TRIGGERS = [
+    "CREATE TABLE closed_round (round INTEGER)",
+    "CREATE TABLE closed_write (name TEXT, round INTEGER)",
+    """CREATE TRIGGER round_closed AFTER UPDATE OF last_round ON auction
+       WHEN NEW.last_round <> OLD.last_round
+       BEGIN INSERT INTO closed_round VALUES (NEW.last_round - 1); END""",
+    *(f"""CREATE TRIGGER closed_{op} AFTER {op} ON bid
+          WHEN NEW.round IN (SELECT round FROM closed_round)
+          BEGIN INSERT INTO closed_write VALUES (NEW.name, NEW.round); END"""
+      for op in ("INSERT", "UPDATE")),
+]
+
+
+def setup(engine, bidders: int):
+    sqlmodel.SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for statement in CLOSED_WRITE_TRIGGERS:
+            connection.exec_driver_sql(statement)
+    with sqlmodel.Session(engine) as session:
+        now = datetime.now()
+        session.add(Auction(id=1, token="race", config_token="race-config", create_at=now, update_at=now,
+                            expiration=now, topic="race", target_bid=1000.0, round_end_mode="manual"))
+        for i in range(bidders):
+            session.add(Bid(ida=1, name=f"B{i}", round=0, bid=0, time=now))
+        summary.rebuild(session, 1)
+        session.commit()
+
+
+def merge_bid(session, name: str, bid: float):
+    """Der frühere ``handle_bid``: Runde lesen, dann ``session.merge`` (samt Zusammenfassungen)."""
+    actual_round = round_status(session, 1).actual_round
+    summary.apply_bid(session, 1, name, actual_round, bid)
+    session.merge(Bid(ida=1, name=name, round=actual_round, bid=bid, time=datetime.now()))
+
+
+def merge_close(session):
+    """Das frühere ``end_round``: Runde lesen, dann ``last_round`` setzen."""
+    actual_round = round_status(session, 1).actual_round
+    session.exec(sqlalchemy.update(Auction).where(Auction.id == 1).values(last_round=actual_round + 1))
+
+
+def end_round(mode: str, engine, seen_round: int) -> bool:
+    """Beendet ``seen_round`` wie ``BidState.end_round``; ``False``, wenn nichts geschrieben wurde."""
+    with sqlmodel.Session(engine) as session:
+        if mode == "upsert":
+            if close_round(session, 1, seen_round) is None:
+                return False
+        else:
+            merge_close(session)
+        session.commit()
+    return True
+
+
+def double_close(mode: str, engine) -> bool:
+    """Zweimal dieselbe Runde beenden, nachdem ein Gebot sie eröffnet hat; ``True``, wenn ``last_round`` zweimal springt."""
+    with sqlmodel.Session(engine) as session:
+        seen_round = round_status(session, 1).actual_round
+        place_bid(session, 1, "B0", 1.0, seen_round)
+        session.commit()
+    last_rounds = []
+    for _ in range(2):
+        try:
+            end_round(mode, engine, seen_round)
+        except RoundClosed:
+            pass
+        with sqlmodel.Session(engine) as session:
+            last_rounds.append(session.exec(select(Auction.last_round).where(Auction.id == 1)).one())
+    return last_rounds[0] != last_rounds[1]
+
+
+def run(mode: str, engine, args) -> dict:
+    latencies = []
+    counts = {"accepted": 0, "rejected": 0, "errors": 0, "rounds_closed": 0, "closes_rejected": 0}
+    lock = threading.Lock()
+    statements = [0]
+    writing = threading.local()
+    done = threading.Event()
+
+    @sqlalchemy.event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        # Nur die Anweisungen der Schreibtransaktion eines Gebots zählen
+        if getattr(writing, "active", False):
+            with lock:
+                statements[0] += 1
+
+    def count_up(key: str):
+        with lock:
+            counts[key] += 1
+
+    def bidder(i: int):
+        rng = random.Random(i)
+        for n in range(args.bids):
+            with sqlmodel.Session(engine) as session:
+                seen_round = round_status(session, 1).actual_round  # was die Seite anzeigt
+            time.sleep(rng.random() * args.think / 1000)
+            start = time.perf_counter()
+            writing.active = True
+            try:
+                with sqlmodel.Session(engine) as session:
+                    if mode == "upsert":
+                        place_bid(session, 1, f"B{i}", float(n + 1), seen_round)
+                    else:
+                        merge_bid(session, f"B{i}", float(n + 1))
+                    session.commit()
+                count_up("accepted")
+            except RoundClosed:
+                count_up("rejected")
+            except Exception:
+                count_up("errors")
+            finally:
+                writing.active = False
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def ender():
+        while not done.wait(args.end_every / 1000):
+            try:
+                with sqlmodel.Session(engine) as session:
+                    seen_round = round_status(session, 1).actual_round
+                if end_round(mode, engine, seen_round):
+                    count_up("rounds_closed")
+            except RoundClosed:
+                count_up("closes_rejected")
+            except Exception:
+                count_up("errors")
+
+    threads = [threading.Thread(target=bidder, args=(i,)) for i in range(args.bidders)]
+    closer = threading.Thread(target=ender)
+    start = time.perf_counter()
+    closer.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.set()
+    closer.join()
+    elapsed = time.perf_counter() - start
+    sqlalchemy.event.remove(engine, "before_cursor_execute", count)
+
+    double = double_close(mode, engine)
+    with engine.connect() as connection:
+        violations = connection.exec_driver_sql("SELECT count(*) FROM closed_write").scalar()
+    with sqlmodel.Session(engine) as session:
+        version = session.exec(select(Auction.version).where(Auction.id == 1)).one()
+    attempts = counts["accepted"] + counts["rejected"] + counts["errors"]
+    return summarize(latencies, elapsed, **counts, closed_round_writes=violations,
+                     double_close_moves_round=double,
+                     statements_per_bid=round(statements[0] / max(attempts, 1), 2), version=version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bidders", type=int, default=20)
+    parser.add_argument("--bids", type=int, default=50, help="Gebote je Bietendem")
+    parser.add_argument("--think", type=float, default=5.0, help="max. ms zwischen Lesen und Bieten")
+    parser.add_argument("--end-every", type=float, default=20.0, help="ms zwischen zwei Rundenenden")
+    parser.add_argument("--mode", choices=("upsert", "merge"), action="append", help="Standard: beide")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.mode or ("merge", "upsert"):
+            engine = db.make_engine(f"sqlite:///{os.path.join(tmp, mode)}.db", db.SQLITE_PRAGMAS,
+                                    pool_size=db.POOL_SIZE, max_overflow=db.MAX_OVERFLOW)
+            setup(engine, args.bidders)
+            report[mode] = run(mode, engine, args)
+            engine.dispose()
+    print(json.dumps(report, indent=2))
+    upsert = report.get("upsert")
+    failed = upsert and (upsert["closed_round_writes"] or upsert["errors"] or upsert["double_close_moves_round"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Vergleicht den bisherigen ORM-Import mit ``CrowdBid.csv_import.import_bids``.
+
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.csv_import --bidders 500 --rounds 30
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import sqlmodel
+from sqlalchemy import delete
+from sqlmodel import select
+
+from CrowdBid import db
+from CrowdBid.csv_import import import_bids
+from CrowdBid.models import Auction, Bid
+
+
+def synthetic_data(bidders: int, rounds: int):
+    return [(f"Bieter {i}", [(r, float(100 + i + r)) for r in range(1, rounds + 1)]) for i in range(bidders)]
+
+
+def orm_import(session, ida, imported_data):
+    """Der bisherige Weg aus EditAuctionState: ein ORM-Objekt je Zelle."""
+    for bid in session.exec(select(Bid).where(Bid.ida == ida)).all():
+        session.delete(bid)
+    current_time = datetime.now()
+    for name, bids in imported_data:
+        session.add(Bid(name=name, round=0, bid=0, ida=ida, time=current_time))
+        for round_num, bid_value in bids:
+            session.add(Bid(name=name, round=round_num, bid=bid_value, ida=ida, time=current_time))
+
+
+def bulk_import(session, ida, imported_data):
+    for _ in import_bids(session, ida, imported_data):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bidders", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+    data = synthetic_data(args.bidders, args.rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.make_engine(f"sqlite:///{os.path.join(tmp, 'import.db')}", db.SQLITE_PRAGMAS)
+        sqlmodel.SQLModel.metadata.create_all(engine)
+        with sqlmodel.Session(engine) as session:
+            # Der Import erhöht die Version der Auktion und protokolliert ein Ereignis
+            now = datetime.now()
+            session.add(Auction(id=1, token="import", config_token="import-config", create_at=now, update_at=now,
+                                expiration=now, topic="Import", target_bid=1000.0))
+            session.commit()
+        for label, run in (("ORM", orm_import), ("Bulk", bulk_import)):
+            with sqlmodel.Session(engine) as session:
+                session.exec(delete(Bid))
+                session.commit()
+            # Zweimal importieren: der zweite Lauf muss die Gebote des ersten löschen
+            for attempt in ("leer", "ersetzen"):
+                start = time.perf_counter()
+                with sqlmodel.Session(engine) as session:
+                    run(session, 1, data)
+                    session.commit()
+                print(f"{label:5} {attempt:9} {args.bidders}x{args.rounds}: {time.perf_counter() - start:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
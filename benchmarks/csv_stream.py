@@ -0,0 +1,70 @@
+"""Misst den Spitzenspeicher des Streaming-Imports für wachsende Dateigrößen.
+
+Importiert wird wie in ``handle_file_upload`` über ``StagedImport``. Die
+Upload-Datei wird dabei nur simuliert und blockweise erzeugt, sie liegt also nie
+vollständig im Speicher. Der Spitzenspeicher darf nicht mit der Dateigröße
+wachsen (einschließlich der Übernahme und des Neuaufbaus der
+Zusammenfassungen); bei mehr als dem Doppelten der kleinsten Größe endet das
+Skript mit Status 1. Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.csv_stream --sizes 1 10
+
+Geprüft sind 1 und 10 MB. Unter tracemalloc dauert ein MB (rund 170 000
+Gebote) etwa 10 s; 100 MB (``--sizes 1 100``) also rund 20 Minuten.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from CrowdBid import db
+from CrowdBid.csv_import import StagedImport, parse_upload
+from CrowdBid.models import Auction
+
+from benchmarks.harness import SyntheticUpload, temp_database
+
+
+async def stream_import(size_mb: int, write: bool) -> dict:
+    upload = SyntheticUpload(size_mb)
+    tracemalloc.start()
+    start = time.perf_counter()
+    staged = StagedImport(1)
+    async for name, bids in parse_upload(upload):
+        if not write:
+            staged.bidders += 1
+        elif staged.add(name, bids):
+            staged.flush()
+    if write:
+        staged.finish()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bidders": staged.bidders, "seconds": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10], help="Dateigrößen in MB")
+    parser.add_argument("--parse-only", action="store_true", help="Zeilen nur parsen, nicht schreiben")
+    args = parser.parse_args()
+
+    with temp_database("stream"):
+        with db.session() as session:
+            # Der Import erhöht die Version der Auktion und protokolliert ein Ereignis
+            now = datetime.now()
+            session.add(Auction(id=1, token="stream", config_token="stream-config", create_at=now, update_at=now,
+                                expiration=now, topic="Import", target_bid=1000.0))
+            session.commit()
+        peaks = []
+        for size in args.sizes:
+            result = asyncio.run(stream_import(size, not args.parse_only))
+            peaks.append(result["peak_mb"])
+            print(f"{size:5d} MB: {result['bidders']:8d} Bieter, {result['seconds']:7.1f} s, "
+                  f"Spitzenspeicher {result['peak_mb']:6.2f} MB")
+    sys.exit(1 if max(peaks) > 2 * min(peaks) else 0)
+
+
+if __name__ == "__main__":
+    main()
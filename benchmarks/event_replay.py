@@ -0,0 +1,173 @@
+"""Verpasste Ereignisse aus dem Protokoll nachholen statt die Gebote neu zu laden.
+
+Eine Sitzung hält die Gebotstabelle einer Auktion mit ``--bidders`` Bietenden
+und ``--rounds`` Runden und hört über ``listeners.registry`` am Relay mit. Das
+Relay trennt die Verbindung; währenddessen werden ``--missed`` Änderungen über
+die Schreibzugriffe der Gebotsseite geschrieben und veröffentlicht (Gebote,
+neue Bietende, Umbenennungen, Rundenenden), die die Sitzung nicht erreichen.
+Nach dem Neuaufbau meldet der Listener ``resume`` und die Sitzung holt wie
+``BidState.ws_listener`` per ``event_log.since`` nach. Geprüft wird, dass die
+Tabelle danach dem neu geladenen Stand entspricht und dass nach einer
+Kompaktierung neu geladen werden muss. Gemessen werden Nachholen und Neuladen.
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.event_replay --bidders 200 --rounds 20 --missed 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import websockets
+
+from CrowdBid import broker, db, events
+from CrowdBid.bid import _load_events, _load_pivot, _write_bid, _write_name, _write_rename, _write_round_end
+from CrowdBid.broker import RelayBroker, publish
+from CrowdBid.cache import pivot_cache
+from CrowdBid.hub import Hub, topic_for
+from CrowdBid.listeners import RECONNECT_DELAY, ListenerRegistry
+from CrowdBid.maintenance import compact_events
+from CrowdBid.queries import round_status
+
+from benchmarks.flow import TOKEN, create_auction
+from benchmarks.harness import free_port, temp_database
+
+
+def current_round(ida: int) -> int:
+    # Eine Runde ohne Gebote bleibt nach dem Beenden die aktuelle
+    with db.session() as session:
+        return round_status(session, ida, with_sums=False).actual_round
+
+
+def view(pivot) -> dict:
+    """Was die Seite anzeigt; die Reihenfolge der Bietenden spielt keine Rolle."""
+    names, cells, current = pivot.encode(slice(None), pivot.rounds)
+    return {"rows": {name: (row, cur) for name, row, cur in zip(names, cells, current)},
+            "actual_round": pivot.actual_round, "missing": pivot.missing, "status": pivot.status}
+
+
+def replay(pivot, seq: int, ida: int) -> bool:
+    """Nachholen wie ``BidState.ws_listener``; ``False`` heißt: neu laden."""
+    missed = _load_events(ida, seq)
+    return missed is not None and all(pivot.apply(events.decode(payload)) for payload in missed)
+
+
+def write_some(ida: int, state: dict, count: int, rng: random.Random) -> list:
+    """Schreibt ``count`` gemischte Änderungen und liefert deren Ereignisse."""
+    payloads = []
+    for _ in range(count):
+        action = rng.random()
+        if action < 0.05:
+            # Eine Runde ohne Gebote bleibt offen (kein Ereignis)
+            if (payload := _write_round_end(ida, state["round"])) is not None:
+                payloads.append(payload)
+            state["round"] = current_round(ida)
+        elif action < 0.1:
+            name = f"Neu {state['added']}"
+            state["added"] += 1
+            payloads.append(_write_name(ida, name))
+            state["names"].append(name)
+        elif action < 0.15:
+            i = rng.randrange(len(state["names"]))
+            old, new = state["names"][i], state["names"][i] + "*"
+            state["names"][i] = new
+            payloads.append(_write_rename(ida, old, new))
+        else:
+            name = rng.choice(state["names"])
+            payloads.append(_write_bid(ida, name, float(rng.randint(1, 5000)), state["round"]))
+    return payloads
+
+
+async def scenario(args) -> dict:
+    relay_hub = Hub()
+    port = free_port()
+    server = await websockets.serve(relay_hub.handle, "127.0.0.1", port)
+    broker._broker = RelayBroker(f"ws://127.0.0.1:{port}")
+    rng = random.Random(1)
+    try:
+        with temp_database("event_replay"):
+            ida = create_auction()
+            state = {"round": 1, "added": 0, "names": [f"Bieter {i}" for i in range(args.bidders)]}
+            for name in state["names"]:
+                _write_name(ida, name)
+            for _ in range(args.rounds):
+                for name in state["names"]:
+                    _write_bid(ida, name, float(rng.randint(1, 5000)), state["round"])
+                _write_round_end(ida, state["round"])
+                state["round"] = current_round(ida)
+
+            registry = ListenerRegistry()
+            feed = registry.join(ida, "tab")
+            _, shared = _load_pivot(TOKEN)
+            before = shared.copy()
+            await asyncio.sleep(0.3)  # Abonnement am Relay steht
+
+            # Verbindung trennen; die folgenden Änderungen erreichen die Sitzung nicht
+            for client in list(relay_hub.subscriptions):
+                await client.websocket.close()
+            for payload in write_some(ida, state, args.missed, rng):
+                await publish(topic_for(ida), payload)
+
+            batch = await asyncio.wait_for(feed.next_batch(), RECONNECT_DELAY + 5)
+            kinds = [events.decode(message.partition("#")[2])["kind"] for message in batch]
+            pivot = before.copy()
+            caught_up = replay(pivot, before.seq, ida) if events.RESUME in kinds else False
+
+            pivot_cache.invalidate(ida)
+            _, fresh = _load_pivot(TOKEN)
+            matches = view(pivot) == view(fresh)
+
+            replay_times, reload_times = [], []
+            for _ in range(args.repeat):
+                pivot = before.copy()
+                start = time.perf_counter()
+                replay(pivot, before.seq, ida)
+                replay_times.append(time.perf_counter() - start)
+                pivot_cache.invalidate(ida)
+                start = time.perf_counter()
+                _load_pivot(TOKEN)
+                reload_times.append(time.perf_counter() - start)
+
+            # Nach der Kompaktierung reicht das Protokoll nicht mehr zurück
+            compacted = sum(b["events"] for b in compact_events(now=datetime.now() + timedelta(days=365)))
+            after_compaction = _load_events(ida, before.seq)
+            registry.leave(ida, "tab", feed)
+    finally:
+        server.close()
+        await server.wait_closed()
+    return {
+        "resume_received": events.RESUME in kinds,
+        "caught_up": caught_up,
+        "matches_reload": matches,
+        "missed_events": fresh.seq - before.seq,
+        "replay_p50_ms": round(statistics.median(replay_times) * 1000, 3),
+        "reload_p50_ms": round(statistics.median(reload_times) * 1000, 3),
+        "compacted_events": compacted,
+        "replay_after_compaction": after_compaction is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bidders", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--missed", type=int, default=50, help="Änderungen während der Unterbrechung")
+    parser.add_argument("--repeat", type=int, default=20, help="Messungen von Nachholen und Neuladen")
+    args = parser.parse_args()
+
+    # Der Listener meldet die getrennte Verbindung per print; die JSON-Ausgabe bleibt sauber
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(scenario(args))
+    print(json.dumps(report, indent=2))
+    ok = (report["resume_received"] and report["caught_up"] and report["matches_reload"]
+          and not report["replay_after_compaction"])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
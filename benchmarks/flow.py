@@ -0,0 +1,233 @@
+"""Lasttest des Bietablaufs mit JSON-Ausgabe.
+
+Treibt die echten Event-Handler (``BidState.add_name``, ``handle_bid``,
+``end_round``, ``load_bids``, ``EditAuctionState.handle_file_upload``), den
+CSV-Export und das WebSocket-Relay (``ws_handler``) gegen eine temporäre
+SQLite-Datenbank. Jeder simulierte Bietende hat eine eigene Sitzung; bis zu
+``--concurrency`` bieten gleichzeitig. Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.flow --bidders 200 --rounds 10 --output flow.json
+
+Je Szenario werden Anzahl, Durchsatz (1/s), p50/p95/p99 (ms) und der
+Spitzenspeicher der Python-Allokationen (MB) ausgegeben.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.metadata
+import json
+import platform
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import websockets
+
+from CrowdBid import db
+from CrowdBid.auction_edit import EditAuctionState
+from CrowdBid.bid import BidState
+from CrowdBid.cache import pivot_cache
+from CrowdBid.CrowdBid import ws_handler
+from CrowdBid.csv_export import bid_lines, result_lines
+from CrowdBid.hub import SUBSCRIBE, topic_for
+from CrowdBid.models import Auction
+
+from benchmarks.harness import (Recorder, SyntheticUpload, call, make_state, peak_memory, run_parallel,
+                                summarize, temp_database)
+
+TOKEN = "benchtoken"
+CONFIG_TOKEN = "benchconfig"
+
+
+def create_auction() -> int:
+    now = datetime.now()
+    with db.session() as session:
+        auction = Auction(token=TOKEN, config_token=CONFIG_TOKEN, create_at=now, update_at=now,
+                          expiration=now + timedelta(days=1), topic="Lasttest", round_end_mode="manual",
+                          target_bid=1_000_000.0)
+        session.add(auction)
+        session.commit()
+        return auction.id
+
+
+def bidding(args) -> dict:
+    """Bietende anlegen, ``--rounds`` Runden bieten und beenden, dann neu laden."""
+    results = {}
+    states = [make_state(BidState, TOKEN) for _ in range(args.bidders)]
+    for state in states:
+        call(state.load_bids())
+
+    recorder = Recorder()
+
+    def add(i):
+        states[i].new_name = f"Bieter {i}"
+        with recorder.measure():
+            call(states[i].add_name())
+
+    with peak_memory(args.memory) as mem:
+        elapsed = run_parallel(add, range(args.bidders), args.concurrency)
+    results["add_name"] = summarize(recorder.latencies, elapsed, mem["peak"], errors=recorder.errors)
+
+    bids, ends = Recorder(), Recorder()
+
+    def bid(i):
+        with bids.measure():
+            call(states[i].handle_bid({"name": f"Bieter {i}", "bid": str(random.randint(1, 5000))}))
+
+    with peak_memory(args.memory) as mem:
+        elapsed = 0.0
+        for _ in range(args.rounds):
+            # Wie nach dem Ereignis zum Rundenende: jede Seite kennt die neue Runde (nicht mitgemessen)
+            run_parallel(lambda i: call(states[i].load_bids()), range(args.bidders), args.concurrency)
+            start = time.perf_counter()
+            run_parallel(bid, range(args.bidders), args.concurrency)
+            with ends.measure():
+                call(states[0].end_round())
+            elapsed += time.perf_counter() - start
+    results["handle_bid"] = summarize(bids.latencies, elapsed, mem["peak"], errors=bids.errors)
+    results["end_round"] = summarize(ends.latencies, elapsed, errors=ends.errors)
+
+    for label, invalidate in (("load_bids_cold", True), ("load_bids_warm", False)):
+        recorder = Recorder()
+        state = states[0]
+
+        def load(_):
+            if invalidate:
+                pivot_cache.invalidate(state.auction.id)
+            with recorder.measure():
+                call(state.load_bids())
+
+        with peak_memory(args.memory) as mem:
+            elapsed = run_parallel(load, range(args.loads), 1)
+        results[label] = summarize(recorder.latencies, elapsed, mem["peak"], errors=recorder.errors)
+    return results
+
+
+async def upload(state, size_mb: float):
+    async for _ in state.handle_file_upload([SyntheticUpload(size_mb)]):
+        pass
+    if state.import_error:
+        raise RuntimeError(state.import_error)
+
+
+def csv_roundtrip(args) -> dict:
+    results = {}
+    state = make_state(EditAuctionState, CONFIG_TOKEN)
+    call(state.get_auction())
+
+    recorder = Recorder()
+    with peak_memory(args.memory) as mem:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            with recorder.measure():
+                asyncio.run(upload(state, args.import_mb))
+        elapsed = time.perf_counter() - start
+    results["csv_import"] = summarize(recorder.latencies, elapsed, mem["peak"], errors=recorder.errors,
+                                      size_mb=args.import_mb)
+
+    for label, lines in (("csv_export", bid_lines), ("csv_export_result", result_lines)):
+        recorder = Recorder()
+        rows = 0
+        with peak_memory(args.memory) as mem:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                with recorder.measure():
+                    rows = sum(1 for _ in lines(state.auction.id))
+            elapsed = time.perf_counter() - start
+        results[label] = summarize(recorder.latencies, elapsed, mem["peak"], errors=recorder.errors, rows=rows)
+    return results
+
+
+async def relay(args) -> dict:
+    """Viele WebSocket-Clients abonnieren Auktionen; ein Sender verteilt über das Relay.
+
+    Gemessen wird die Zeit vom Senden bis zum Empfang bei jedem Abonnenten.
+    """
+    latencies = []
+    expected = 0
+    done = asyncio.Event()
+
+    async with websockets.serve(ws_handler, "127.0.0.1", 0, ping_interval=None) as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        clients = [await websockets.connect(url, ping_interval=None) for _ in range(args.clients)]
+        subscribers = {}
+        for i, client in enumerate(clients):
+            topic = topic_for(i % args.auctions)
+            subscribers[topic] = subscribers.get(topic, 0) + 1
+            await client.send(f"{SUBSCRIBE}#{topic}")
+
+        async def receive(client):
+            async for message in client:
+                latencies.append(time.perf_counter() - float(message.partition("#")[2]))
+                if len(latencies) >= expected:
+                    done.set()
+
+        readers = [asyncio.create_task(receive(client)) for client in clients]
+        sender = await websockets.connect(url, ping_interval=None)
+        await asyncio.sleep(0.2)  # Abonnements sind verarbeitet
+        targets = [random.randrange(args.auctions) for _ in range(args.messages)]
+        expected = sum(subscribers.get(topic_for(t), 0) for t in targets)
+        with peak_memory(args.memory) as mem:
+            start = time.perf_counter()
+            for target in targets:
+                await sender.send(f"{topic_for(target)}#{time.perf_counter()}")
+            try:
+                await asyncio.wait_for(done.wait(), timeout=60)
+            except asyncio.TimeoutError:
+                pass
+            elapsed = time.perf_counter() - start
+        for task in readers:
+            task.cancel()
+        for client in clients + [sender]:
+            await client.close()
+    return {"relay": summarize(latencies, elapsed, mem["peak"], expected=expected, clients=args.clients,
+                               auctions=args.auctions, messages=args.messages)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bidders", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20, help="gleichzeitig bietende Sitzungen")
+    parser.add_argument("--loads", type=int, default=50, help="Aufrufe von load_bids")
+    parser.add_argument("--import-mb", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen von Import und Export")
+    parser.add_argument("--clients", type=int, default=500, help="WebSocket-Clients am Relay")
+    parser.add_argument("--auctions", type=int, default=50, help="Auktionen, auf die sich die Clients verteilen")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Spitzenspeicher nicht messen (tracemalloc verlangsamt die Messung)")
+    parser.add_argument("--output", help="JSON zusätzlich in diese Datei schreiben")
+    args = parser.parse_args()
+    random.seed(1)
+
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "reflex": importlib.metadata.version("reflex"),
+            "sqlite": sqlite3.sqlite_version,
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+    # Ausgaben der Handler gehen nach stderr, auf stdout steht nur das JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        with temp_database("flow"):
+            create_auction()
+            report["scenarios"].update(bidding(args))
+            report["scenarios"].update(csv_roundtrip(args))
+        report["scenarios"].update(asyncio.run(relay(args)))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Gemeinsame Hilfen der Lasttests: temporäre Datenbank, Sitzungen, Messwerte, freie Ports."""
+import asyncio
+import contextlib
+import inspect
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+import sqlmodel
+from reflex.state import RouterData, State
+
+from CrowdBid import db
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def summarize(latencies: List[float], elapsed: float, peak_bytes: int = 0, **extra) -> dict:
+    """Kennzahlen eines Szenarios; Latenzen in Sekunden, Ausgabe in ms."""
+    return {
+        "count": len(latencies),
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "peak_mb": round(peak_bytes / 1024 / 1024, 3),
+        **extra,
+    }
+
+
+class Recorder:
+    """Sammelt Latenzen, auch aus mehreren Threads."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.append(elapsed)
+
+
+@contextlib.contextmanager
+def temp_database(name: str = "bench"):
+    """Legt eine leere SQLite-Datenbank an und leitet ``db.session()`` dorthin um."""
+    previous = db._engine
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.make_engine(f"sqlite:///{os.path.join(tmp, name)}.db", db.SQLITE_PRAGMAS,
+                                pool_size=db.POOL_SIZE, max_overflow=db.MAX_OVERFLOW)
+        sqlmodel.SQLModel.metadata.create_all(engine)
+        db._engine = engine
+        try:
+            yield engine
+        finally:
+            db._engine = previous
+            engine.dispose()
+
+
+def free_port() -> int:
+    """Ein freier lokaler Port, z.B. für ein Relay des Tests."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def peak_memory(enabled: bool = True):
+    """Misst den Spitzenspeicher (Python-Allokationen) des Blocks.
+
+    Liefert ein Dict, in dem nach dem Block ``peak`` (Bytes) steht.
+    """
+    result = {"peak": 0}
+    if not enabled:
+        yield result
+        return
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        result["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def make_state(state_cls, token: str):
+    """Eine eigene Sitzung mit ``token`` als Seitenparameter, wie beim Aufruf von /<token>/..."""
+    root = State(_reflex_internal_init=True)
+    root.router_data = {"query": {"token": token}, "pathname": "", "headers": {}}
+    root.router = RouterData(root.router_data)
+    return root.get_substate(state_cls.get_full_name().split("."))
+
+
+def call(result):
+    """Ergebnis eines Event-Handlers; asynchrone Handler werden per ``asyncio.run`` ausgeführt."""
+    return asyncio.run(result) if inspect.iscoroutine(result) else result
+
+
+def run_parallel(work: Callable, items: Iterable, concurrency: int) -> float:
+    """Führt ``work(item)`` mit ``concurrency`` Threads aus und liefert die Dauer."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(work, items))
+    return time.perf_counter() - start
+
+
+class SyntheticUpload:
+    """Verhält sich wie ``rx.UploadFile.read(size)`` für eine erzeugte CSV-Datei."""
+
+    def __init__(self, size_mb: float, rounds: int = 30, name: str = "synthetic.csv"):
+        self.name = name
+        self.remaining = int(size_mb * 1024 * 1024)
+        self.rounds = rounds
+        self.buffer = b""
+        self.bidder = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        while len(self.buffer) < size and self.remaining > 0:
+            self.bidder += 1
+            line = f"Bieter {self.bidder};" + ";".join(f"{100 + r}.5" for r in range(self.rounds)) + "\n"
+            data = line.encode("utf-8")[:self.remaining]
+            self.remaining -= len(data)
+            self.buffer += data
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
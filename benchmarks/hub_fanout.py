@@ -0,0 +1,69 @@
+"""Vergleicht die Fan-out-Kosten des alten Broadcast-Relays mit dem Hub.
+
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.hub_fanout --sockets 1000 --auctions 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from CrowdBid.hub import Hub, topic_for
+
+
+class FakeSocket:
+    """Ersetzt eine WebSocket-Verbindung und zählt nur die Sendungen."""
+
+    def __init__(self, auction_id: int):
+        self.auction_id = auction_id
+        self.received = 0
+
+    async def send(self, message: str):
+        self.received += 1
+        # Der alte ws_listener hat jede Nachricht zerlegt und verglichen
+        message.split("#")
+
+
+async def broadcast(clients: set, message: str, sender=None) -> int:
+    """Das bisherige Verhalten von ws_handler: jede Nachricht an alle."""
+    sent = 0
+    for client in clients.copy():
+        if client != sender:
+            await client.send(message)
+            sent += 1
+    return sent
+
+
+async def run(sockets: int, auctions: int, messages: int):
+    random.seed(1)
+    clients = [FakeSocket(i % auctions) for i in range(sockets)]
+    hub = Hub()
+    for client in clients:
+        hub.subscribe(client, topic_for(client.auction_id))
+    targets = [random.randrange(auctions) for _ in range(messages)]
+
+    start = time.perf_counter()
+    old_sent = 0
+    for ida in targets:
+        old_sent += await broadcast(set(clients), f"{topic_for(ida)}#Gebot")
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_sent = 0
+    for ida in targets:
+        new_sent += await hub.publish(topic_for(ida), f"{topic_for(ida)}#Gebot")
+    new_time = time.perf_counter() - start
+
+    print(f"{sockets} Sockets, {auctions} Auktionen, {messages} Nachrichten")
+    print(f"Broadcast: {old_sent / messages:8.1f} Sendungen/Nachricht, {old_time / messages * 1e6:8.1f} µs/Nachricht")
+    print(f"Hub:       {new_sent / messages:8.1f} Sendungen/Nachricht, {new_time / messages * 1e6:8.1f} µs/Nachricht")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--auctions", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.sockets, args.auctions, args.messages))
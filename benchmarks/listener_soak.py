@@ -0,0 +1,159 @@
+"""Dauertest der Auktions-Listener: bleiben Tasks und Abonnements begrenzt?
+
+Simuliert ``--cycles`` Runden, in denen Tabs Auktionsseiten öffnen, neu laden
+(gleiches Client-Token) und schließen. ``old`` startet wie der frühere
+``ws_listener`` je Seitenaufruf einen eigenen Task mit eigenem Abonnement, der
+nie endet; ``registry`` nutzt ``listeners.registry`` wie ``BidState.ws_listener``.
+Geschlossene Tabs erkennt die Registry über eine simulierte Verbindungsliste.
+Gemeldet werden je Runde die Zahl der Tasks, der Abonnements beim Broker (bei
+``--broker relay`` die Sockets am Relay) und die Sitzungen der Registry.
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.listener_soak --cycles 20 --auctions 5 --tabs 40
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+import websockets
+
+from CrowdBid import broker
+from CrowdBid.broker import RelayBroker, listen, publish
+from CrowdBid.hub import Hub, hub, topic_for
+from CrowdBid.listeners import ListenerRegistry
+
+from benchmarks.harness import free_port
+
+
+async def old_session(ida: int, received: dict, token: str):
+    """Der frühere ``ws_listener``: abonniert neu, bis der Task abgebrochen wird."""
+    while True:
+        try:
+            async for batch in listen(topic_for(ida), window=0):
+                received[token] = received.get(token, 0) + len(batch)
+        except Exception:
+            await asyncio.sleep(0.1)
+
+
+async def registry_session(registry: ListenerRegistry, ida: int, received: dict, token: str):
+    """Wie ``BidState.ws_listener``: ein Feed je Tab, beendet beim Schließen oder Neuladen."""
+    feed = registry.join(ida, token)
+    try:
+        while (batch := await feed.next_batch()) is not None:
+            received[token] = received.get(token, 0) + len(batch)
+    finally:
+        registry.leave(ida, token, feed)
+
+
+async def scenario(mode: str, args) -> dict:
+    relay_hub, server = hub, None
+    if args.broker == "relay":
+        relay_hub = Hub()
+        port = free_port()
+        server = await websockets.serve(relay_hub.handle, "127.0.0.1", port)
+        broker._broker = RelayBroker(f"ws://127.0.0.1:{port}")
+    else:
+        broker._broker = broker.MemoryBroker()
+
+    rng = random.Random(1)
+    alive = set()
+    registry = ListenerRegistry(sweep_interval=args.sweep / 1000)
+    registry.is_alive = alive.__contains__
+    received = {}
+    tabs = {}  # Client-Token -> Auktion
+    baseline = len(asyncio.all_tasks())
+    samples = []
+    next_token = 0
+
+    def open_tab(token: str, ida: int):
+        tabs[token] = ida
+        alive.add(token)
+        if mode == "old":
+            asyncio.create_task(old_session(ida, received, token))
+        else:
+            asyncio.create_task(registry_session(registry, ida, received, token))
+
+    for cycle in range(args.cycles):
+        for _ in range(args.tabs):
+            action = rng.random()
+            if tabs and action < 0.3:  # Neu laden: gleiches Token, neuer Seitenaufruf
+                token = rng.choice(list(tabs))
+                open_tab(token, tabs[token])
+            elif tabs and action < 0.6:  # Tab schließen
+                token = rng.choice(list(tabs))
+                del tabs[token]
+                alive.discard(token)
+            else:
+                next_token += 1
+                open_tab(f"tab-{next_token}", rng.randrange(args.auctions))
+        await asyncio.sleep(args.sweep / 1000 * 2.5)  # zwei Prüfungen der Registry
+        samples.append({
+            "cycle": cycle,
+            "open_tabs": len(tabs),
+            "tasks": len(asyncio.all_tasks()) - baseline,
+            "upstream": sum(len(clients) for clients in relay_hub.topics.values()),
+            **registry.counts(),
+        })
+
+    # Zustellung an die offenen Tabs prüfen
+    before = {token: received.get(token, 0) for token in tabs}
+    for ida in set(tabs.values()):
+        await publish(topic_for(ida), "soak")
+    await asyncio.sleep(0.3)
+    missing = sum(1 for token in tabs if received.get(token, 0) <= before[token])
+
+    # Alle Tabs schließen; danach muss die Registry leer sein
+    alive.clear()
+    tabs.clear()
+    await asyncio.sleep(args.sweep / 1000 * 3)
+    drained = {
+        "tasks": len(asyncio.all_tasks()) - baseline,
+        "upstream": sum(len(clients) for clients in relay_hub.topics.values()),
+        **registry.counts(),
+    }
+
+    for task in asyncio.all_tasks() - {asyncio.current_task()}:
+        task.cancel()
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+    return {
+        "max_tasks": max(s["tasks"] for s in samples),
+        "max_upstream": max(s["upstream"] for s in samples),
+        "max_open_tabs": max(s["open_tabs"] for s in samples),
+        "missing_deliveries": missing,
+        "drained": drained,
+        "samples": samples if args.verbose else samples[-1:],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--auctions", type=int, default=5)
+    parser.add_argument("--tabs", type=int, default=40, help="Aktionen (öffnen/neu laden/schließen) je Runde")
+    parser.add_argument("--sweep", type=float, default=50.0, help="ms zwischen zwei Prüfungen der Registry")
+    parser.add_argument("--broker", choices=("memory", "relay"), default="memory")
+    parser.add_argument("--mode", choices=("old", "registry"), action="append", help="Standard: beide")
+    parser.add_argument("--verbose", action="store_true", help="alle Runden ausgeben")
+    args = parser.parse_args()
+
+    report = {mode: asyncio.run(scenario(mode, args)) for mode in args.mode or ("old", "registry")}
+    print(json.dumps(report, indent=2))
+    result = report.get("registry")
+    # Begrenzt: höchstens ein Abonnement je Auktion, Tasks nur für offene Tabs, am Ende leer
+    bounded = result is None or (
+        result["max_upstream"] <= args.auctions
+        and result["max_tasks"] <= result["max_open_tabs"] + args.auctions + 1
+        and result["missing_deliveries"] == 0
+        and result["drained"]["upstream"] == 0
+        and result["drained"]["auctions"] == 0
+        and result["drained"]["tasks"] == 0
+    )
+    sys.exit(0 if bounded else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Verzögerung der Event-Schleife, während viele Sitzungen gleichzeitig bieten.
+
+Alle Sitzungen laufen wie im Reflex-Backend in einer Event-Schleife; jede
+bietet ``--bids`` Mal und lädt danach die Tabelle neu. Ein Messtask schläft
+wiederholt ``--tick`` ms und misst, wie viel später er aufwacht – so lange
+müsste auch jede WebSocket-Nachricht warten. ``inline`` führt die
+Datenbankzugriffe direkt in der Schleife aus (wie die früheren synchronen
+Handler), ``pool`` über ``db.run``. Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.loop_lag --bidders 200 --bids 10
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import sys
+import time
+
+from CrowdBid import db
+from CrowdBid.bid import BidState, _write_name
+
+from benchmarks.flow import TOKEN, create_auction
+from benchmarks.harness import make_state, summarize, temp_database
+
+
+async def inline(fn, *args, **kwargs):
+    """Ersatz für ``db.run``: blockiert die Schleife wie ein synchroner Handler."""
+    return fn(*args, **kwargs)
+
+
+async def probe(stop: asyncio.Event, tick: float, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(tick)
+        lags.append(loop.time() - start - tick)
+
+
+async def bidder(state, i: int, args, latencies: list):
+    rng = random.Random(i)
+    for _ in range(args.bids):
+        await asyncio.sleep(rng.random() * args.think / 1000)
+        start = time.perf_counter()
+        await state.handle_bid({"name": f"Bieter {i}", "bid": str(rng.randint(1, 5000))})
+        await state.load_bids()
+        latencies.append(time.perf_counter() - start)
+
+
+async def scenario(mode: str, args) -> dict:
+    run = db.run
+    if mode == "inline":
+        db.run = inline
+    try:
+        with temp_database("loop_lag"):
+            ida = create_auction()
+            states = [make_state(BidState, TOKEN) for _ in range(args.bidders)]
+            for i in range(args.bidders):
+                _write_name(ida, f"Bieter {i}")
+            for state in states:
+                await state.load_bids()
+
+            lags, latencies = [], []
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe(stop, args.tick / 1000, lags))
+            start = time.perf_counter()
+            await asyncio.gather(*(bidder(state, i, args, latencies) for i, state in enumerate(states)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await prober
+    finally:
+        db.run = run
+    return {
+        "loop_lag": summarize(lags, elapsed, max_ms=round(max(lags) * 1000, 3) if lags else None),
+        "bid_and_reload": summarize(latencies, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bidders", type=int, default=200)
+    parser.add_argument("--bids", type=int, default=10, help="Gebote je Sitzung")
+    parser.add_argument("--think", type=float, default=200.0, help="max. ms Pause vor jedem Gebot")
+    parser.add_argument("--tick", type=float, default=10.0, help="ms zwischen zwei Messungen")
+    parser.add_argument("--mode", choices=("inline", "pool"), action="append", help="Standard: beide")
+    args = parser.parse_args()
+
+    report = {}
+    for mode in args.mode or ("inline", "pool"):
+        # Handler geben Fehler per print aus; die JSON-Ausgabe bleibt sauber
+        with contextlib.redirect_stdout(sys.stderr):
+            report[mode] = asyncio.run(scenario(mode, args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Mehrere Worker-Prozesse auf einem Rechner: kommen Nachrichten über den Broker überall an?
+
+Jeder Prozess wählt den Broker wie die App über CROWDBID_BROKER, abonniert
+dasselbe Thema, veröffentlicht ``--messages`` Nachrichten und zählt, was er
+von allen Prozessen erhält. Beim Relay versucht jeder Prozess wie
+``deploy_ws`` das Relay zu starten; nur der erste bekommt den Port. Redis wird
+nur geprüft, wenn das Paket installiert und der Server erreichbar ist.
+``memory`` dient als Gegenprobe (erreicht nur den eigenen Prozess).
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.multi_worker --workers 4 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import sqlmodel
+
+from benchmarks.harness import free_port, summarize
+
+TOPIC = "A1"
+BACKENDS = ("memory", "relay", "sqlite", "redis")
+
+
+async def run_worker(index: int, args, port: int, barrier) -> dict:
+    import websockets
+
+    from CrowdBid.broker import get_broker, publish
+    from CrowdBid.hub import hub
+
+    relay = None
+    if args.backend == "relay":
+        try:
+            relay = await websockets.serve(hub.handle, "127.0.0.1", port)
+        except OSError:
+            pass
+    await asyncio.to_thread(barrier.wait)
+
+    subscription = await get_broker().subscribe(TOPIC)
+    await asyncio.to_thread(barrier.wait)
+
+    expected = args.workers * args.messages
+    senders, latencies = {}, []
+
+    async def receive():
+        while len(latencies) < expected:
+            text = (await subscription.receive()).partition("#")[2]
+            sender, _, sent = text.split(":")
+            senders[sender] = senders.get(sender, 0) + 1
+            latencies.append(time.time() - float(sent))
+
+    start = time.perf_counter()
+    receiver = asyncio.create_task(receive())
+    for n in range(args.messages):
+        await publish(TOPIC, f"{index}:{n}:{time.time()}")
+        await asyncio.sleep(args.interval / 1000)
+    try:
+        await asyncio.wait_for(receiver, args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    await subscription.close()
+    # Das Relay erst schließen, wenn alle fertig sind
+    await asyncio.to_thread(barrier.wait)
+    if relay is not None:
+        relay.close()
+    return summarize(latencies, elapsed, worker=index, relay=relay is not None, senders=len(senders))
+
+
+def worker(index: int, args, port: int, db_path: str, barrier, results):
+    os.environ["CROWDBID_BROKER"] = args.backend
+    os.environ["CROWDBID_RELAY_URL"] = f"ws://127.0.0.1:{port}"
+    os.environ["CROWDBID_BROKER_POLL_MS"] = str(args.poll)
+    from CrowdBid import db
+
+    db._engine = db.make_engine(f"sqlite:///{db_path}", db.SQLITE_PRAGMAS)
+    try:
+        results.put(asyncio.run(run_worker(index, args, port, barrier)))
+    except Exception as e:
+        results.put({"worker": index, "error": str(e)})
+
+
+def redis_available() -> bool:
+    from CrowdBid.broker import REDIS_URL, aioredis
+
+    if aioredis is None:
+        return False
+
+    async def ping():
+        client = aioredis.from_url(REDIS_URL)
+        try:
+            return await client.ping()
+        finally:
+            await client.aclose()
+
+    try:
+        return asyncio.run(ping())
+    except Exception:
+        return False
+
+
+def run_backend(args) -> dict:
+    from CrowdBid.models import BrokerMessage
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "broker.db")
+        engine = sqlmodel.create_engine(f"sqlite:///{db_path}")
+        sqlmodel.SQLModel.metadata.create_all(engine, tables=[BrokerMessage.__table__])
+        engine.dispose()
+        barrier = context.Barrier(args.workers, timeout=args.timeout + 30)
+        results = context.Queue()
+        port = free_port()
+        processes = [context.Process(target=worker, args=(i, args, port, db_path, barrier, results))
+                     for i in range(args.workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        reports = sorted((results.get(timeout=args.timeout + 60) for _ in processes), key=lambda r: r["worker"])
+        for process in processes:
+            process.join()
+    expected = args.workers * args.messages
+    return {
+        "seconds": round(time.perf_counter() - start, 2),
+        "expected_per_worker": expected,
+        "complete": all(r.get("count") == expected for r in reports),
+        "workers": reports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=50, help="Nachrichten je Worker")
+    parser.add_argument("--interval", type=float, default=5.0, help="ms zwischen zwei Nachrichten")
+    parser.add_argument("--poll", type=float, default=50.0, help="CROWDBID_BROKER_POLL_MS für sqlite")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Sekunden Warten auf ausstehende Nachrichten")
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="Standard: alle")
+    args = parser.parse_args()
+
+    report, failed = {}, False
+    for backend in args.backend or BACKENDS:
+        if backend == "redis" and not redis_available():
+            report[backend] = "übersprungen (Paket redis oder Server fehlt)"
+            continue
+        args.backend = backend
+        report[backend] = run_backend(args)
+        if backend != "memory" and not report[backend]["complete"]:
+            failed = True
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Vergleicht Speicherbedarf und Übertragungsgröße der Gebotstabelle.
+
+Gegenübergestellt werden die frühere Darstellung (ein Dict je Bietendem mit
+Runden als Schlüsseln) und die spaltenweise ``BidPivot`` samt kompakter
+Listenform für den Browser. Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.pivot_size --bidders 200 --rounds 50
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from CrowdBid import events
+from CrowdBid.pivot import BidPivot
+
+
+def make_values(bidders: int, rounds: int) -> dict:
+    """Jeder Bietende bietet in etwa 80 % der Runden, sonst wird übernommen."""
+    random.seed(1)
+    values = {}
+    for b in range(bidders):
+        bids = {0: 0}
+        for r in range(1, rounds + 1):
+            if r == 1 or random.random() < 0.8:
+                bids[r] = float(random.randint(10, 200))
+        values[f"Bieter {b}"] = bids
+    return values
+
+
+def row_dicts(pivot: BidPivot) -> list:
+    """Die frühere Zeilenform: ``{'name': ..., runde: wert}``."""
+    rounds = list(range(1, pivot.actual_round + 1))
+    rows = []
+    for i, name in enumerate(pivot.names):
+        row = {'name': name}
+        for r in rounds:
+            value = pivot.cell(i, r)
+            if value is not None:
+                row[r] = value
+        rows.append(row)
+    return rows
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bidders", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--events", type=int, default=10000, help="Gebote für die Ereignismessung")
+    args = parser.parse_args()
+
+    values = make_values(args.bidders, args.rounds)
+    pivot, columnar = measure(lambda: BidPivot.from_values(values, args.rounds, "manual", 1000.0))
+    rows, dicts = measure(lambda: row_dicts(pivot))
+    print(f"{args.bidders} Bietende x {args.rounds} Runden")
+    print(f"Speicher Zeilen-Dicts:   {dicts / 1024:8.1f} KiB")
+    print(f"Speicher Spalten:        {columnar / 1024:8.1f} KiB")
+
+    names, cells, current = pivot.encode(slice(None), pivot.rounds)
+    old_json = json.dumps(rows)
+    new_json = json.dumps({"names": names, "cells": cells, "current": current})
+    print(f"JSON Zeilen-Dicts:       {len(old_json) / 1024:8.1f} KiB")
+    print(f"JSON Listenform:         {len(new_json) / 1024:8.1f} KiB")
+
+    start = time.perf_counter()
+    for n in range(args.events):
+        pivot.apply({"kind": events.BID, "name": pivot.names[n % args.bidders],
+                     "round": pivot.actual_round, "bid": float(n % 150)})
+    elapsed = time.perf_counter() - start
+    print(f"Gebot einarbeiten:       {elapsed / args.events * 1e6:8.1f} µs je Ereignis")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        pivot.encode(slice(0, 50), pivot.rounds[-12:])
+    print(f"Ausschnitt 50x12 kodieren: {(time.perf_counter() - start) / 100 * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
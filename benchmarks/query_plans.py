@@ -0,0 +1,47 @@
+"""Prüft per ``EXPLAIN QUERY PLAN``, dass die häufigen Abfragen einen Index nutzen.
+
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.query_plans
+
+Beendet sich mit Status 1, wenn eine Abfrage die Tabelle vollständig durchsucht.
+"""
+import sys
+from datetime import datetime
+
+import sqlalchemy
+import sqlmodel
+from sqlmodel import func, select
+
+from CrowdBid.models import Auction, Bid
+
+
+def hot_queries():
+    subq = select(Bid.name, func.max(Bid.round).label("max_round")).where(Bid.ida == 1).group_by(Bid.name).subquery()
+    return {
+        "Gebote einer Auktion": select(Bid).where(Bid.ida == 1),
+        "Letzte Runde je Name": select(Bid).join(subq, (Bid.name == subq.c.name) & (Bid.round == subq.c.max_round)).where(Bid.ida == 1),
+        "Abgelaufene Auktionen": select(Auction).where(Auction.expiration < datetime.now()),
+        "Gebote eines Namens": select(Bid).where((Bid.ida == 1) & (Bid.name == "Max")),
+        "Gebote einer Runde": select(Bid).where((Bid.ida == 1) & (Bid.round == 1)),
+    }
+
+
+def main() -> int:
+    engine = sqlalchemy.create_engine("sqlite://")
+    sqlmodel.SQLModel.metadata.create_all(engine)
+    failed = False
+    with engine.connect() as conn:
+        for label, query in hot_queries().items():
+            compiled = query.compile(engine)
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params.values())).all()
+            details = [row[-1] for row in plan]
+            # Zwischenergebnisse (z.B. materialisierte Unterabfragen) dürfen durchsucht werden
+            scans = [d for d in details if d.startswith(("SCAN bid", "SCAN auction")) and "INDEX" not in d]
+            failed |= bool(scans)
+            print(f"{'FEHLER' if scans else 'OK':6} {label}: {' | '.join(details)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
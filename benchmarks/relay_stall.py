@@ -0,0 +1,140 @@
+"""Relay mit einem hängenden Client: direkte Sendungen gegen Warteschlangen je Client.
+
+Teil 1 verteilt Nachrichten über den ``Hub`` an gesunde Clients und einen,
+dessen ``send`` nie fertig wird (wie bei vollem TCP-Fenster). Ohne
+Warteschlangen (``direct``) bleibt die Verteilung an ihm hängen; mit
+(``queue``) erhalten die übrigen alles, und er wird nach ``--send-timeout``
+getrennt.
+
+Teil 2 prüft den Heartbeat: ein echter WebSocket-Client, der nicht mehr liest
+(und damit auch keine Pings beantwortet), muss vom Relay getrennt werden.
+Das dauert Intervall + Timeout des Heartbeats und ``--close-timeout`` für das
+Schließen ohne Antwort; ohne Trennung endet das Skript mit Status 1.
+Aufruf aus dem Projektverzeichnis::
+
+    python -m benchmarks.relay_stall --clients 20 --messages 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+
+from CrowdBid.hub import SUBSCRIBE, Hub, SocketClient, topic_for
+
+from benchmarks.harness import summarize
+
+TOPIC = topic_for(1)
+
+
+class HealthySocket:
+    def __init__(self, latencies: list):
+        self.latencies = latencies
+        self.reloads = 0
+
+    async def send(self, message: str):
+        await asyncio.sleep(0)
+        text = message.partition("#")[2]
+        if text.startswith("{"):
+            self.reloads += 1
+        else:
+            self.latencies.append(time.perf_counter() - float(text))
+
+    async def close(self):
+        pass
+
+
+class StalledSocket:
+    """Nimmt keine Daten mehr an: ``send`` kehrt nie zurück."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def send(self, message: str):
+        await asyncio.Event().wait()
+
+    async def close(self):
+        self.closed = True
+
+
+async def fanout(mode: str, args) -> dict:
+    hub = Hub(outbox_size=args.outbox, send_timeout=args.send_timeout)
+    latencies = []
+    healthy = [HealthySocket(latencies) for _ in range(args.clients)]
+    stalled = StalledSocket()
+    sockets = [stalled] + healthy
+    clients = [SocketClient(s, hub) for s in sockets] if mode == "queue" else sockets
+    for client in clients:
+        hub.subscribe(client, TOPIC)
+
+    async def send_all():
+        for _ in range(args.messages):
+            await hub.publish(TOPIC, f"{TOPIC}#{time.perf_counter()}")
+            await asyncio.sleep(args.interval / 1000)
+
+    start = time.perf_counter()
+    evicted_after = delivered_after = None
+    sending = asyncio.create_task(send_all())
+    expected = args.clients * args.messages
+    while time.perf_counter() - start < args.timeout:
+        finished = sending.done()
+        if evicted_after is None and stalled.closed:
+            evicted_after = time.perf_counter() - start
+        if delivered_after is None and finished and len(latencies) + sum(s.reloads for s in healthy) >= expected:
+            delivered_after = time.perf_counter() - start
+        if delivered_after is not None and (mode == "direct" or stalled.closed):
+            break
+        await asyncio.sleep(0.01)
+    # Durchsatz bis alle gesunden Clients versorgt sind, ohne das Warten auf die Trennung
+    elapsed = delivered_after if delivered_after is not None else time.perf_counter() - start
+    sending.cancel()
+    for client in clients:
+        if isinstance(client, SocketClient):
+            client.task.cancel()
+    return summarize(latencies, elapsed, delivered=len(latencies), expected=expected,
+                     reloads=sum(s.reloads for s in healthy), publish_finished=sending.done() and not sending.cancelled(),
+                     stalled_coalesced=clients[0].outbox.dropped if mode == "queue" else None,
+                     stalled_evicted_after_s=round(evicted_after, 3) if evicted_after is not None else None)
+
+
+async def heartbeat(args) -> dict:
+    hub = Hub()
+    async with websockets.serve(hub.handle, "127.0.0.1", 0, ping_interval=args.ping, ping_timeout=args.ping,
+                                close_timeout=args.close_timeout) as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        # max_queue=1 und nie recv(): nach der ersten Nachricht liest der Client nichts mehr
+        silent = await websockets.connect(url, ping_interval=None, max_queue=1)
+        await silent.send(f"{SUBSCRIBE}#{TOPIC}")
+        await asyncio.sleep(0.1)
+        for _ in range(2):
+            await hub.publish(TOPIC, f"{TOPIC}#fill")
+        start = time.perf_counter()
+        while hub.topics.get(TOPIC) and time.perf_counter() - start < args.timeout:
+            await asyncio.sleep(0.05)
+        evicted = not hub.topics.get(TOPIC)
+        silent.transport.abort()
+    return {"ping_s": args.ping, "close_timeout_s": args.close_timeout, "evicted": evicted, "evicted_after_s": round(time.perf_counter() - start, 3) if evicted else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="gesunde Clients")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=1.0, help="ms zwischen zwei Nachrichten")
+    parser.add_argument("--outbox", type=int, default=100)
+    parser.add_argument("--send-timeout", type=float, default=1.0)
+    parser.add_argument("--ping", type=float, default=1.0, help="Heartbeat-Intervall und -Timeout")
+    parser.add_argument("--close-timeout", type=float, default=1.0, help="Sekunden für das Schließen des Heartbeats")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Abbruch je Teil in Sekunden")
+    args = parser.parse_args()
+
+    report = {f"fanout_{mode}": asyncio.run(fanout(mode, args)) for mode in ("direct", "queue")}
+    report["heartbeat"] = asyncio.run(heartbeat(args))
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["heartbeat"]["evicted"] else 1)
+
+
+if __name__ == "__main__":
+    main()
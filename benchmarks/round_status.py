@@ -0,0 +1,88 @@
+"""Vergleicht ``queries.round_status`` mit der Berechnung über ``BidPivot``.
+
+Erzeugt zufällige Auktionen in einer temporären SQLite-Datenbank und prüft,
+dass aktuelle Runde, fehlende Gebote, Rundensummen und Statuszeile aus den
+Zusammenfassungen (per ``summary.rebuild`` aus den SQL-Aggregaten aufgebaut)
+mit der Python-Tabelle übereinstimmen. Aufruf aus dem
+Projektverzeichnis::
+
+    python -m benchmarks.round_status --auctions 500
+
+Beendet sich mit Status 1 bei einer Abweichung.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import sqlmodel
+from sqlmodel import select
+
+from CrowdBid import db, summary
+from CrowdBid.models import Auction, Bid
+from CrowdBid.pivot import BidPivot
+from CrowdBid.queries import round_status
+
+
+def random_auction(session, ida: int):
+    now = datetime.now()
+    last_round = random.choice([-1, -1, random.randint(1, 6)])
+    session.add(Auction(id=ida, token=f"t{ida}", config_token=f"c{ida}", create_at=now, update_at=now,
+                        round_end_mode=random.choice(["auto", "manual"]), target_bid=float(random.randint(50, 500)),
+                        last_round=last_round))
+    rounds = random.randint(0, 6)
+    for b in range(random.randint(0, 8)):
+        name = f"Bieter {b}"
+        if random.random() < 0.9:
+            session.add(Bid(ida=ida, name=name, round=0, bid=0, time=now))
+        for r in range(1, rounds + 1):
+            if random.random() < 0.6:
+                # Halbe Euro: die Summen sind in beiden Verfahren exakt
+                session.add(Bid(ida=ida, name=name, round=r, bid=random.randint(0, 400) / 2, time=now))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--auctions", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = db.make_engine(f"sqlite:///{os.path.join(tmp, 'status.db')}", db.SQLITE_PRAGMAS)
+        sqlmodel.SQLModel.metadata.create_all(engine)
+        with sqlmodel.Session(engine) as session:
+            for ida in range(1, args.auctions + 1):
+                random_auction(session, ida)
+                summary.rebuild(session, ida)
+            session.commit()
+
+        failed = 0
+        sql_time = pivot_time = 0.0
+        with sqlmodel.Session(engine) as session:
+            for ida in range(1, args.auctions + 1):
+                start = time.perf_counter()
+                status = round_status(session, ida)
+                sql_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                auction = session.get(Auction, ida)
+                pivot = BidPivot.from_bids(auction, session.exec(select(Bid).where(Bid.ida == ida)).all())
+                pivot_time += time.perf_counter() - start
+
+                got = (status.actual_round, status.missing, status.sums[:status.actual_round - 1], status.status)
+                expected = (pivot.actual_round, pivot.missing, pivot.sums, pivot.status)
+                if got != expected:
+                    failed += 1
+                    print(f"Auktion {ida}: SQL {got} != Tabelle {expected}")
+
+    print(f"{args.auctions} Auktionen, {failed} Abweichungen; "
+          f"SQL {sql_time / args.auctions * 1e3:.2f} ms, Tabelle {pivot_time / args.auctions * 1e3:.2f} ms je Auktion")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Prüft die Zusammenfassungen (``roundsummary``, ``latestbid``) unter zufälligen Änderungen.
+
+Auf ``--auctions`` Auktionen werden ``--steps`` Änderungen über die echten
+Schreibzugriffe ausgeführt: Gebote (Bietende lassen Runden aus, es gilt dann
+das übernommene Gebot), Rundenenden, neue Bietende, Umbenennungen, Änderungen
+der Datenseite und CSV-Importe. Nach jedem Schritt muss ``summary.verify``
+ohne Abweichung bleiben und ``round_status`` mit der aus den Geboten gebauten
+Tabelle übereinstimmen. Zusätzlich wird eine Zeile verfälscht und per
+``verify(repair=True)`` repariert. Gemessen wird ``round_status`` gegen die
+bisherige Auswertung über alle Gebote für eine große Auktion. Aufruf aus dem
+Projektverzeichnis::
+
+    python -m benchmarks.summary_check --auctions 5 --steps 400
+
+Beendet sich mit Status 1 bei einer Abweichung.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, distinct, insert, update
+from sqlmodel import func, select
+
+from CrowdBid import db, summary
+from CrowdBid.bid import _write_bid, _write_name, _write_rename, _write_round_end
+from CrowdBid.bid_data import _add_bid, _delete_bid, _update_bid
+from CrowdBid.csv_import import import_bids
+from CrowdBid.models import Auction, Bid, RoundSummary
+from CrowdBid.pivot import BidPivot
+from CrowdBid.queries import round_status
+from CrowdBid.writes import RoundClosed
+
+from benchmarks.harness import temp_database
+
+
+def create_auction(n: int, mode: str) -> int:
+    now = datetime.now()
+    with db.session() as session:
+        auction = Auction(token=f"t{n}", config_token=f"c{n}", create_at=now, update_at=now,
+                          expiration=now + timedelta(days=1), topic=f"Prüfung {n}", round_end_mode=mode,
+                          target_bid=1000.0)
+        session.add(auction)
+        session.commit()
+        return auction.id
+
+
+def bid_scan_status(session, ida: int):
+    """Die bisherige Auswertung von ``round_status`` über alle Gebote der Auktion."""
+    max_round = select(func.max(Bid.round)).where(Bid.ida == ida).scalar_subquery()
+    ar, bidders, with_value, at_ar = session.exec(
+        select(
+            func.coalesce(func.max(Bid.round), 0),
+            func.count(distinct(Bid.name)),
+            func.count(distinct(case((Bid.round >= 1, Bid.name)))),
+            func.count(case((Bid.round == max_round, 1))),
+        ).where(Bid.ida == ida)
+    ).one()
+    totals = {row.round: row.total for row in session.exec(summary.summary_rows(ida)).all()}
+    sums = []
+    for r in range(1, ar + 1):
+        # Runden ohne neue Gebote haben keine Zeile, es gilt die Summe davor
+        sums.append(float(totals.get(r, sums[-1] if sums else 0.0)))
+    return ar, bidders, with_value, at_ar, sums
+
+
+def check(ida: int) -> list:
+    with db.session() as session:
+        problems = summary.verify(session, ida)
+        auction = session.get(Auction, ida)
+        status = round_status(session, ida)
+        pivot = BidPivot.from_bids(auction, session.exec(select(Bid).where(Bid.ida == ida)).all())
+    got = (status.actual_round, status.missing, status.sums[:status.actual_round - 1], status.status)
+    want = (pivot.actual_round, pivot.missing, pivot.sums, pivot.status)
+    if got != want:
+        problems.append(f"round_status {got} != Tabelle {want}")
+    return problems
+
+
+def step(ida: int, names: list, rng: random.Random, counter: list):
+    action = rng.random()
+    with db.session() as session:
+        actual_round = round_status(session, ida, with_sums=False).actual_round
+    if action < 0.55 and names:
+        # Zufällige Bietende: wer eine Runde auslässt, für den gilt sein voriges Gebot weiter
+        _write_bid(ida, rng.choice(names), float(rng.randint(1, 400)) / 2, actual_round)
+    elif action < 0.65:
+        _write_round_end(ida, actual_round)
+    elif action < 0.75:
+        counter[0] += 1
+        names.append(f"Bieter {counter[0]}")
+        _write_name(ida, names[-1])
+    elif action < 0.8 and names:
+        i = rng.randrange(len(names))
+        new = f"{names[i]}'"
+        if _write_rename(ida, names[i], new) is not None:
+            names[i] = new
+    elif action < 0.9 and names:
+        # Datenseite: ein Gebot in einer früheren Runde ändern, löschen oder nachtragen
+        with db.session() as session:
+            bids = session.exec(select(Bid).where((Bid.ida == ida) & (Bid.round >= 1))).all()
+        if bids and rng.random() < 0.7:
+            bid = rng.choice(bids)
+            if rng.random() < 0.5:
+                _update_bid(ida, bid.name, bid.round, {"bid": float(rng.randint(1, 400))})
+            else:
+                _delete_bid(ida, bid.name, bid.round)
+        else:
+            name, r = rng.choice(names), rng.randint(1, max(actual_round, 1))
+            with db.session() as session:
+                exists = session.get(Bid, (ida, name, r)) is not None
+            if not exists:
+                _add_bid(ida, {"name": name, "round": r, "bid": float(rng.randint(1, 400)), "time": datetime.now()})
+    elif action < 0.93:
+        data = [(f"Import {i}", [(r, float(rng.randint(1, 400))) for r in range(1, rng.randint(1, 5))
+                                 if rng.random() < 0.7]) for i in range(rng.randint(1, 8))]
+        with db.session() as session:
+            for _ in import_bids(session, ida, data):
+                pass
+            session.commit()
+        names[:] = [name for name, _ in data]
+
+
+def timing(bidders: int, rounds: int, repeat: int) -> dict:
+    ida = create_auction(0, "manual")
+    now = datetime.now()
+    rng = random.Random(2)
+    rows = [{"ida": ida, "name": f"B{b}", "round": r, "bid": float(rng.randint(1, 400)), "time": now}
+            for b in range(bidders) for r in range(rounds + 1) if r == 0 or rng.random() < 0.8]
+    with db.session() as session:
+        session.execute(insert(Bid), rows)
+        summary.rebuild(session, ida)
+        session.commit()
+    new, old = [], []
+    with db.session() as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            round_status(session, ida)
+            new.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            bid_scan_status(session, ida)
+            old.append(time.perf_counter() - start)
+    return {"bids": len(rows), "summary_p50_ms": round(statistics.median(new) * 1000, 3),
+            "bid_scan_p50_ms": round(statistics.median(old) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--auctions", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=400, help="Änderungen je Auktion")
+    parser.add_argument("--bidders", type=int, default=1000, help="Bietende der Auktion für die Zeitmessung")
+    parser.add_argument("--rounds", type=int, default=50, help="Runden der Auktion für die Zeitmessung")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = {"steps": 0, "rejected": 0, "problems": []}
+    with temp_database("summary_check"):
+        for n in range(1, args.auctions + 1):
+            rng = random.Random(args.seed * 1000 + n)
+            ida = create_auction(n, rng.choice(["auto", "manual"]))
+            names, counter = [], [0]
+            for i in range(args.steps):
+                try:
+                    step(ida, names, rng, counter)
+                except RoundClosed:
+                    report["rejected"] += 1
+                report["steps"] += 1
+                report["problems"] += [f"Auktion {ida}, Schritt {i}: {p}" for p in check(ida)]
+
+            # Verfälschen, erkennen, reparieren
+            with db.session() as session:
+                corrupted = session.exec(update(RoundSummary).where(RoundSummary.ida == ida)
+                                         .values(total=RoundSummary.total + 1)).rowcount
+                session.commit()
+            with db.session() as session:
+                detected = summary.verify(session, ida, repair=True)
+                session.commit()
+            if corrupted and not detected:
+                report["problems"].append(f"Auktion {ida}: Verfälschung nicht erkannt")
+            report["problems"] += [f"Auktion {ida}, nach Reparatur: {p}" for p in check(ida)]
+
+        report["timing"] = timing(args.bidders, args.rounds, args.repeat)
+    report["problems"] = report["problems"][:20]
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if report["problems"] else 0)
+
+
+if __name__ == "__main__":
+    main()